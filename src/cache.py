@@ -1,98 +1,339 @@
 """
 Thumbnail cache for Synology Photos
+
+Caches are shared by all processes (explorer windows, tree demo, ...) of the user :
+    - default location is absolute (user cache folder), relative settings are resolved against it
+    - a claim table in the cache ensures that only one process downloads a given element
 """
 
+import os
+import time
 import logging
-from threading import Lock, Event
-from concurrent.futures import (
-    ThreadPoolExecutor,
-    as_completed,
-    Future,
-    CancelledError,
-    InvalidStateError,
-)
+import functools
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future
 
 from diskcache import Cache
-from PyQt6.QtCore import QSettings
+from diskcache.core import ENOVAL, args_to_key
+from PyQt6.QtCore import QSettings, QStandardPaths
+
+from synology_photos_api.exceptions import PhotosError
 
 log = logging.getLogger(__name__)
 
+# base folder for caches when path in settings is relative
+CACHE_BASE_PATH = os.path.join(
+    QStandardPaths.writableLocation(QStandardPaths.StandardLocation.GenericCacheLocation),
+    "SynoPhotosExplorer",
+)
+
+# claim on a key expires after this delay (seconds) : protect against crashed process
+CLAIM_EXPIRE = 60
+# delay between checks when waiting for a key claimed by another process
+CLAIM_POLL = 0.05
+CLAIM_TAG = "claim"
+
+
+def cache_path(setting: str, default: str) -> str:
+    """return absolute cache path from settings"""
+    path = QSettings("fdenivac", "SynoPhotosExplorer").value(setting, default)
+    return os.path.abspath(os.path.join(CACHE_BASE_PATH, os.path.expanduser(path)))
+
+
+def open_cache(path_setting: str, default_path: str, size_setting: str) -> Cache:
+    """open a cache shared between processes"""
+    cache = Cache(
+        cache_path(path_setting, default_path),
+        size_limit=int(QSettings("fdenivac", "SynoPhotosExplorer").value(size_setting, 1024 * 1024 * 512)),
+        statistics=1,
+        # no database write on read : concurrent readers in several processes do not contend
+        eviction_policy="least-recently-stored",
+    )
+    log.info(f"cache opened in {cache.directory}")
+    return cache
+
+
+def restrict_access(cache: Cache) -> None:
+    """
+    cache folders and files readable by user only (cache holding secrets, as a session id)
+
+    Files created later (database journal, values files) are protected by the folder mode,
+    call again after writing secrets to restrict them too
+    """
+    for folder, folders, files in os.walk(cache.directory):
+        os.chmod(folder, 0o700)
+        for name in files:
+            os.chmod(os.path.join(folder, name), 0o600)
+
+
+class LazyCache:
+    """
+    Cache opened on first use (startup does not wait for database opening)
+
+    Forwards attributes and mapping operations to the Cache opened by `open_cache`
+    """
+
+    def __init__(self, path_setting: str, default_path: str, size_setting: str):
+        self._args = (path_setting, default_path, size_setting)
+        self._cache = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> Cache:
+        if self._cache is None:
+            with self._lock:
+                if self._cache is None:
+                    self._cache = open_cache(*self._args)
+        return self._cache
+
+    def __getattr__(self, name):
+        return getattr(self._open(), name)
+
+    def __contains__(self, key) -> bool:
+        return key in self._open()
+
+    def __getitem__(self, key):
+        return self._open()[key]
+
+    def __setitem__(self, key, value) -> None:
+        self._open()[key] = value
+
+    def __delitem__(self, key) -> None:
+        del self._open()[key]
+
+    def __iter__(self):
+        return iter(self._open())
+
+    def __len__(self) -> int:
+        return len(self._open())
+
+
+@contextmanager
+def _renewed_claim(cache: Cache, claim_key, claim_expire: float):
+    """keep claim alive while running (long downloads), every half expire delay"""
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(claim_expire / 2):
+            cache.touch(claim_key, expire=claim_expire, retry=True)
+
+    thread = threading.Thread(target=renew, name="claim-renew", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def memoize(
+    cache: Cache, name: str, tag: str, claim_expire: float = CLAIM_EXPIRE, on_store=None, renew_claim: bool = False
+):
+    """
+    Decorator like Cache.memoize, but with cross-process single-flight :
+    before calling the function on a cache miss, a claim is added (atomically) in the cache.
+    Others processes/threads asking the same key wait for the result instead of downloading it.
+
+    Keys are built as in Cache.memoize
+
+    on_store : optional callable(key) called after a new result is stored in cache
+    renew_claim : claim renewed while function runs, for calls that may last longer than claim_expire
+    """
+
+    def decorator(func):
+        base = (name,)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = wrapper.__cache_key__(*args, **kwargs)
+            claim_key = (CLAIM_TAG,) + key
+            while True:
+                result = cache.get(key, default=ENOVAL, retry=True)
+                if result is not ENOVAL:
+                    return result
+                if cache.add(claim_key, os.getpid(), expire=claim_expire, tag=CLAIM_TAG, retry=True):
+                    try:
+                        if renew_claim:
+                            with _renewed_claim(cache, claim_key, claim_expire):
+                                result = func(*args, **kwargs)
+                        else:
+                            result = func(*args, **kwargs)
+                        # empty result (failure, fake api) not stored : no cache entry that never heals
+                        if not result:
+                            return result
+                        cache.set(key, result, tag=tag, retry=True)
+                        if on_store is not None:
+                            on_store(key)
+                        return result
+                    finally:
+                        cache.delete(claim_key, retry=True)
+                # claimed by another : wait for result, or for claim released/expired (failure)
+                log.debug(f"wait for claimed key {key}")
+                while claim_key in cache and key not in cache:
+                    time.sleep(CLAIM_POLL)
+
+        def __cache_key__(*args, **kwargs):
+            """Make key for cache given function arguments."""
+            return args_to_key(base, args, kwargs, False, ())
+
+        wrapper.__cache_key__ = __cache_key__
+        return wrapper
+
+    return decorator
+
+
 # set thumbnail cache
 THUMB_CALLABLE_NAME = "get_thumb"
-thumbcache = Cache(
-    QSettings("fdenivac", "SynoPhotosExplorer").value("thumbcachepath", ".thumbcache_synophoto"),
-    size_limit=QSettings("fdenivac", "SynoPhotosExplorer").value("thumbcachesize", 1024 * 1024 * 512),
-    statistics=1,
-)
+thumbcache = LazyCache("thumbcachepath", "thumbcache", "thumbcachesize")
 
 # set photo cache
 PHOTO_CALLABLE_NAME = "get_photo"
-photocache = Cache(
-    QSettings("fdenivac", "SynoPhotosExplorer").value("photocachepath", ".photocache_synophoto"),
-    size_limit=QSettings("fdenivac", "SynoPhotosExplorer").value("photocachesize", 1024 * 1024 * 512),
-    statistics=1,
-)
+# large thumbnails (slideshow preview) are kept in photo cache
+XL_CALLABLE_NAME = "get_thumb_xl"
+photocache = LazyCache("photocachepath", "photocache", "photocachesize")
 
+# set metadata cache (photos space, ...) : avoid requests for data already seen in listings
+metacache = LazyCache("metacachepath", "metacache", "metacachesize")
 
-class ControlDownloadPool:
+
+class DownloadGenerations:
     """
-    Clean results and Future objects,
-    Cancel all futures
+    Cancellation of background downloads by navigation generation
 
+    Each folder visit starts a new generation (a token). Work submitted for an older generation
+    is dropped when a worker dequeues it : no futures list, no lock on the GUI thread
     """
 
-    def __init__(self):
-        self._lock = Lock()
-        self._event_quit = Event()
-        self.futures: list[Future] = []
-
-    def add_future(self, future: Future):
-        self._lock.acquire()
-        self.futures.append(future)
-        self._lock.release()
-
-    def clean_futures(self):
-        self._lock.acquire()
-        for future in as_completed(self.futures):
-            try:
-                # read result for clean future reference
-                self.futures.remove(future)
-                log.debug("clean_futures future removed")
-                future.result()
-            except (InvalidStateError, CancelledError) as _e:
-                pass
-            except Exception as _e:
-                log.info(f"clean_futures EXCEPTION: {_e}")
-        self._lock.release()
-
-    def loop_clean_futures(self, time_loop: float = 1.0):
-        """
-        loop clean futures (in thread possibly)
+    def __init__(self, executor: ThreadPoolExecutor):
+        self._executor = executor
+        # only incremented from GUI thread, read by workers (atomic int under GIL)
+        self._generation = 0
+
+    def new_generation(self) -> int:
+        """start new generation : all pending work becomes stale"""
+        self._generation += 1
+        return self._generation
+
+    def current(self) -> int:
+        """current generation"""
+        return self._generation
+
+    def is_current(self, generation: int) -> bool:
+        """return True if generation not stale"""
+        return generation == self._generation
+
+    def submit(self, generation: int, fn, *args, **kwargs) -> Future:
+        """submit work for generation, dropped at dequeue time if generation is stale"""
+
+        def run():
+            if generation != self._generation:
+                return None
+            return fn(*args, **kwargs)
+
+        future = self._executor.submit(run)
+        future.add_done_callback(_log_future_exception)
+        return future
+
+
+def _log_future_exception(future: Future):
+    """log exception of background work"""
+    if not future.cancelled() and future.exception() is not None:
+        log.info(f"download EXCEPTION: {future.exception()}")
+
+
+class AdaptiveLimiter:
+    """
+    Adaptive limit of requests in flight to the NAS (AIMD)
+
+    The limit grows by one per window of successful requests (additive increase),
+    and is cut (multiplicative decrease) when latency exceeds the target or a request fails,
+    at most once per latency period. Throughput finds its own point for each NAS.
+
+    The GUI thread is never blocked : its requests are counted but do not wait for a slot
+    """
+
+    DECREASE_FACTOR = 0.7
+    # weight of last request in average latency
+    LATENCY_WEIGHT = 0.2
+
+    def __init__(self, min_limit: int, max_limit: int, latency_target: float, benign_errors: tuple = ()):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.latency_target = latency_target
+        # errors which are API answers (photo not found, ...) and not sign of an overload
+        self.benign_errors = benign_errors
+        self._cond = threading.Condition()
+        self._limit = float(self.min_limit)
+        self._inflight = 0
+        self._last_decrease = 0.0
+        self.latency = 0.0
+        self.errors = 0
+
+    @property
+    def limit(self) -> int:
+        """current limit"""
+        return int(self._limit)
+
+    @property
+    def inflight(self) -> int:
+        """requests in flight"""
+        return self._inflight
+
+    @contextmanager
+    def slot(self, measure: bool = True):
         """
-        while True:
-            self.clean_futures()
-            if self._event_quit.wait(time_loop):
-                return
+        context for one request to the NAS
 
-    def cancel_futures(self):
-        log.debug("cancel_futures start")
-        self._lock.acquire()
-        for future in self.futures:
-            if not future.done():
-                future.cancel()
-        log.debug("cancel_futures end")
-        self._lock.release()
+            measure : latency used for adjusting the limit (False for requests long by nature, as photo download)
+        """
+        with self._cond:
+            if threading.current_thread() is not threading.main_thread():
+                while self._inflight >= int(self._limit):
+                    self._cond.wait()
+            self._inflight += 1
+        start = time.monotonic()
+        failed = False
+        try:
+            yield
+        except self.benign_errors:
+            raise
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._release(time.monotonic() - start, failed, measure)
 
-    def exit_loop(self):
-        self._event_quit.set()
+    def _release(self, latency: float, failed: bool, measure: bool):
+        """end of request : adjust limit"""
+        with self._cond:
+            self._inflight -= 1
+            now = time.monotonic()
+            if failed:
+                self.errors += 1
+            if measure:
+                self.latency += self.LATENCY_WEIGHT * (latency - self.latency) if self.latency else latency
+            if failed or (measure and latency > self.latency_target):
+                # only one decrease for all requests started before the last one
+                if now - self._last_decrease > latency:
+                    self._limit = max(self.min_limit, self._limit * self.DECREASE_FACTOR)
+                    self._last_decrease = now
+                    log.debug(f"download limit decreased to {self.limit} (latency {latency:.2f}s, failed {failed})")
+            elif measure:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._cond.notify_all()
 
 
-# download thread pool
-download_thread_pool = ThreadPoolExecutor(max_workers=10, thread_name_prefix="thumb")
+# limits of requests in flight to the NAS
+_settings = QSettings("fdenivac", "SynoPhotosExplorer")
+download_limiter = AdaptiveLimiter(
+    int(_settings.value("downloadminworkers", 2)),
+    int(_settings.value("downloadmaxworkers", 16)),
+    float(_settings.value("downloadlatencytarget", 1.0)),
+    benign_errors=(PhotosError,),
+)
 
-# manage the download pool (the futures)
-control_thread_pool = ControlDownloadPool()
+# download thread pool (one more thread for the childs download loop)
+download_thread_pool = ThreadPoolExecutor(max_workers=download_limiter.max_limit + 1, thread_name_prefix="thumb")
 
-# thread cleaning futures
-futures_cleaner_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="futures_cleaner")
-future_control_thread_pool = futures_cleaner_thread.submit(control_thread_pool.loop_clean_futures)
+# manage the download pool (stale work dropped)
+download_generations = DownloadGenerations(download_thread_pool)
@@ -0,0 +1,244 @@
+"""
+Portable cache bundles : export and import pre-warmed thumbnails cache
+
+A bundle is a zip archive with :
+    - "manifest.json" : list of entries (thumbnail cache arguments, cache tag, photo description)
+    - "thumbs/<n>" : thumbnails data as stored in cache
+
+Usage :
+    python cachebundle.py export bundle.zip --path /Personal/2023 [--recursive] [--download-missing]
+    python cachebundle.py export bundle.zip --album "My Album"
+    python cachebundle.py export bundle.zip --from 2023-01-01 --to 2023-12-31 [--shared]
+    python cachebundle.py import bundle.zip [--check-nas]
+
+Login parameters are read from .env file (see README)
+"""
+
+from __future__ import annotations
+import os
+import re
+import sys
+import json
+import zipfile
+import logging
+import argparse
+from datetime import datetime
+from pathlib import PurePosixPath
+from typing import Iterator
+
+from PyQt6.QtCore import QCoreApplication
+from PyQt6.QtGui import QImage
+
+from dotenv import load_dotenv
+
+from cache import thumbcache
+from cacheddownload import download_thumbnail, THUMB_TAG
+from photos_api import synofoto
+
+
+# take environment variables (addr, port ,user, password, ...) from .env file
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+BUNDLE_VERSION = 1
+
+# thumbnail cache_key from Synology Photos : "<photo id>_<timestamp>"
+RE_CACHE_KEY = re.compile(r"^(\d+)_(\d+)$")
+
+
+def photos_in_path(path: str, recursive: bool = False) -> Iterator[tuple[dict, bool, None]]:
+    """photos in folder path as "/Personal/..." or "/Shared/...". Yield (photo, shared, passphrase)"""
+    parts = PurePosixPath(path).parts
+    if len(parts) < 2 or parts[1] not in ["Personal", "Shared"]:
+        raise ValueError(f"Invalid path {path} : must start with /Personal or /Shared")
+    team = parts[1] == "Shared"
+    folder = synofoto.api.lookup_folder(str(PurePosixPath("/").joinpath(*parts[2:])), team=team)
+    if not folder:
+        raise ValueError(f"Folder {path} not found")
+    folders = [folder]
+    while folders:
+        folder = folders.pop(0)
+        for photo in synofoto.api.iter_photos_in_folder(folder["id"], team, additional=["thumbnail"]):
+            yield photo, team, None
+        if recursive:
+            folders.extend(synofoto.api.iter_list_folders(folder["id"], team))
+
+
+def photos_in_album_named(name: str) -> Iterator[tuple[dict, None, str]]:
+    """photos in personal album. Yield (photo, shared, passphrase)"""
+    albums = synofoto.api.get_albums(name)
+    if not albums:
+        raise ValueError(f"Album {name} not found")
+    album = albums[0]
+    # same arguments as in explorer album space
+    for photo in synofoto.api.iter_photos_in_album(album["id"], additional=["thumbnail"]):
+        yield photo, None, album["passphrase"]
+
+
+def photos_in_date_range(start: datetime, end: datetime, team: bool) -> Iterator[tuple[dict, bool, None]]:
+    """photos taken in date range. Yield (photo, shared, passphrase)"""
+    root_id = synofoto.api.get_folder(team=team)["id"]
+    filters = synofoto.api.build_filters({"time": (start, end)}, team=team)
+    for photo in synofoto.api.iter_photos_with_filter(root_id, filters, team, additional=["thumbnail"]):
+        yield photo, team, None
+
+
+def export_bundle(filename: str, photos, download_missing: bool = False) -> tuple[int, int]:
+    """export cached thumbnails of photos in bundle. Return (exported, missing) counts"""
+    manifest = {"version": BUNDLE_VERSION, "created": int(datetime.now().timestamp()), "entries": []}
+    missing = 0
+    with zipfile.ZipFile(filename, "w", compression=zipfile.ZIP_STORED) as bundle:
+        for photo, shared, passphrase in photos:
+            try:
+                cache_key = photo["additional"]["thumbnail"]["cache_key"]
+            except (KeyError, TypeError):
+                missing += 1
+                continue
+            args = [photo["id"], cache_key, shared, passphrase]
+            key = download_thumbnail.__cache_key__(*args)
+            if key not in thumbcache and download_missing:
+                download_thumbnail(*args)
+            raw_image, tag = thumbcache.get(key, tag=True, retry=True)
+            if not raw_image:
+                missing += 1
+                continue
+            name = f"thumbs/{len(manifest['entries'])}"
+            bundle.writestr(name, raw_image)
+            manifest["entries"].append({"args": args, "tag": tag, "file": name, "photo": photo})
+        bundle.writestr(MANIFEST_NAME, json.dumps(manifest))
+    log.info(f"{len(manifest['entries'])} thumbnails exported in {filename}, {missing} not in cache")
+    return len(manifest["entries"]), missing
+
+
+def _check_entry(entry: dict, raw_image: bytes) -> str | None:
+    """validate bundle entry. Return reason if invalid"""
+    try:
+        inode, cache_key, shared, passphrase = entry["args"]
+    except (KeyError, TypeError, ValueError):
+        return "invalid arguments"
+    if not isinstance(inode, int) or not isinstance(cache_key, str):
+        return "invalid arguments type"
+    match = RE_CACHE_KEY.match(cache_key)
+    if not match or int(match.group(1)) != inode:
+        return f"invalid cache_key {cache_key}"
+    if shared not in [None, True, False] or not (passphrase is None or isinstance(passphrase, str)):
+        return "invalid space"
+    photo = entry.get("photo", {})
+    if photo.get("id") != inode or photo.get("additional", {}).get("thumbnail", {}).get("cache_key") != cache_key:
+        return "photo description mismatch"
+    if not str(entry.get("tag")).startswith(THUMB_TAG):
+        return f"invalid tag {entry.get('tag')}"
+    if not raw_image or QImage.fromData(raw_image).isNull():
+        return "undecodable image"
+    return None
+
+
+def _current_cache_keys(entries: list[dict]) -> dict[int, str]:
+    """get current thumbnail cache_key on NAS for entries photos (photos not found are ignored)"""
+    current = {}
+    for team in [False, True]:
+        ids = [
+            entry["args"][0]
+            for entry in entries
+            if isinstance(entry.get("args"), list) and len(entry["args"]) == 4 and entry["args"][2] in [team, None]
+        ]
+        for photo_id, photo in synofoto.api.hydrator.get_many(ids, team, additional=["thumbnail"]).items():
+            current[photo_id] = photo["additional"]["thumbnail"]["cache_key"]
+    return current
+
+
+def import_bundle(filename: str, check_nas: bool = False) -> tuple[int, int]:
+    """import bundle in thumbnails cache. Return (imported, rejected) counts"""
+    imported = rejected = 0
+    with zipfile.ZipFile(filename, "r") as bundle:
+        manifest = json.loads(bundle.read(MANIFEST_NAME))
+        if manifest.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported bundle version {manifest.get('version')}")
+        entries = manifest["entries"]
+        current = _current_cache_keys(entries) if check_nas else None
+        for entry in entries:
+            raw_image = bundle.read(entry["file"])
+            reason = _check_entry(entry, raw_image)
+            if reason is None and current is not None:
+                inode, cache_key = entry["args"][:2]
+                if current.get(inode, cache_key) != cache_key:
+                    reason = "outdated on NAS"
+            if reason:
+                log.warning(f"entry {entry.get('args')} rejected : {reason}")
+                rejected += 1
+                continue
+            key = download_thumbnail.__cache_key__(*entry["args"])
+            thumbcache.set(key, raw_image, tag=entry["tag"], retry=True)
+            imported += 1
+    log.info(f"{imported} thumbnails imported from {filename}, {rejected} rejected")
+    return imported, rejected
+
+
+def login() -> bool:
+    """login to Synology Photos using .env"""
+    synofoto.login(
+        os.environ.get("SYNO_ADDR"),
+        os.environ.get("SYNO_PORT"),
+        os.environ.get("SYNO_USER"),
+        os.environ.get("SYNO_PASSWORD"),
+        os.environ.get("SYNO_SECURE"),
+        os.environ.get("SYNO_CERTVERIF"),
+        7,
+        False,
+        os.environ.get("SYNO_OPTCODE"),
+    )
+    if not synofoto.is_connected():
+        log.error(f"Failed to connect to Synology Photos ({os.environ.get('SYNO_ADDR')}) : {synofoto.exception}")
+    return synofoto.is_connected()
+
+
+def main(argv: list[str]) -> int:
+    """command line"""
+    parser = argparse.ArgumentParser(description="Export/import thumbnails cache bundles")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="export cached thumbnails in bundle")
+    export_parser.add_argument("bundle", help="bundle file (zip)")
+    selection = export_parser.add_mutually_exclusive_group(required=True)
+    selection.add_argument("--path", help='folder path, as "/Personal/2023"')
+    selection.add_argument("--album", help="album name")
+    selection.add_argument("--from", dest="date_from", type=datetime.fromisoformat, help="start date (YYYY-MM-DD)")
+    export_parser.add_argument("--to", dest="date_to", type=datetime.fromisoformat, help="end date (YYYY-MM-DD)")
+    export_parser.add_argument("--shared", action="store_true", help="date range in shared space")
+    export_parser.add_argument("--recursive", action="store_true", help="include sub folders")
+    export_parser.add_argument(
+        "--download-missing", action="store_true", help="download thumbnails not in cache before export"
+    )
+
+    import_parser = commands.add_parser("import", help="import bundle in thumbnails cache")
+    import_parser.add_argument("bundle", help="bundle file (zip)")
+    import_parser.add_argument("--check-nas", action="store_true", help="reject thumbnails outdated on NAS")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        if not login():
+            return 1
+        if args.path:
+            photos = photos_in_path(args.path, args.recursive)
+        elif args.album:
+            photos = photos_in_album_named(args.album)
+        else:
+            date_to = args.date_to if args.date_to else datetime.now()
+            photos = photos_in_date_range(args.date_from, date_to.replace(hour=23, minute=59, second=59), args.shared)
+        export_bundle(args.bundle, photos, args.download_missing)
+
+    elif args.command == "import":
+        if args.check_nas and not login():
+            return 1
+        import_bundle(args.bundle, args.check_nas)
+
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    app = QCoreApplication(sys.argv)
+    sys.exit(main(sys.argv[1:]))
@@ -1,48 +1,233 @@
 """
     Thumbnails download cached function
+
+    Thumbnails can be transcoded in cache to a compact format (settings "thumbcacheformat", "thumbcachequality"),
+    and converted once to sRGB colorspace (setting "thumbcachesrgb").
+    The format is marked in the cache tag : "thumb" for data as downloaded, "thumb/<format>" when transcoded.
 """
 
-from cache import thumbcache, photocache, THUMB_CALLABLE_NAME, PHOTO_CALLABLE_NAME
+import io
+import logging
+import functools
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from cache import thumbcache, photocache, memoize, download_limiter
+from cache import THUMB_CALLABLE_NAME, PHOTO_CALLABLE_NAME, XL_CALLABLE_NAME
 from PyQt6.QtGui import (
     QImage,
-    QPixmap,
-    QColorSpace,
+    QImageReader,
 )
 from PyQt6.QtCore import (
+    Qt,
+    QSize,
     QByteArray,
     QBuffer,
     QIODeviceBase,
+    QSettings,
 )
 from internalconfig import CACHE_PIXMAP
+from colortransform import is_srgb, to_srgb
+
+log = logging.getLogger(__name__)
+
+THUMB_TAG = "thumb"
+
+# transcode thumbnail in cache to this format ("" : no transcoding)
+TRANSCODE_FORMAT = QSettings("fdenivac", "SynoPhotosExplorer").value("thumbcacheformat", "").upper()
+TRANSCODE_QUALITY = int(QSettings("fdenivac", "SynoPhotosExplorer").value("thumbcachequality", 75))
+# convert thumbnail in cache to sRGB (no conversion on each display)
+TRANSCODE_SRGB = QSettings("fdenivac", "SynoPhotosExplorer").value("thumbcachesrgb", "false") == "true"
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls : callers asking for a key already in flight
+    wait for the shared result instead of doing the same request to the NAS
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._inflight: dict[object, Future] = {}
+
+    def call(self, key, func, *args, **kwargs):
+        """call func, or wait for result of the call in flight for key"""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            log.debug(f"wait for in-flight {key}")
+            return future.result()
+        try:
+            result = func(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as _e:
+            future.set_exception(_e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
 
+def single_flight(func):
+    """decorator for memoized function : concurrent calls with same cache key share one call"""
+    flight = SingleFlight()
 
-@thumbcache.memoize(name=THUMB_CALLABLE_NAME, tag="thumb")
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return flight.call(func.__cache_key__(*args, **kwargs), func, *args, **kwargs)
+
+    wrapper.__cache_key__ = func.__cache_key__
+    return wrapper
+
+
+# one thread is enough for transcoding (never in GUI thread)
+transcode_thread_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transcode")
+
+
+def transcode_thumbnail(key) -> bool:
+    """re-encode cached thumbnail to compact format and/or sRGB. Return True if cache updated"""
+    global TRANSCODE_FORMAT
+    raw_image, tag = thumbcache.get(key, tag=True, retry=True)
+    if not raw_image or tag != THUMB_TAG:
+        # not in cache or already transcoded
+        return False
+    image = QImage()
+    if not image.loadFromData(raw_image):
+        return False
+    converted = TRANSCODE_SRGB and not is_srgb(image.colorSpace())
+    if converted:
+        to_srgb(image)
+    elif not TRANSCODE_FORMAT:
+        return False
+    image_format = TRANSCODE_FORMAT or "JPEG"
+    array = QByteArray()
+    buffer = QBuffer(array)
+    buffer.open(QIODeviceBase.OpenModeFlag.WriteOnly)
+    if not image.save(buffer, image_format, TRANSCODE_QUALITY):
+        log.warning(f"thumbnail cache format {image_format} unsupported : transcoding disabled")
+        TRANSCODE_FORMAT = ""
+        return False
+    data = array.data()
+    if not converted and len(data) >= len(raw_image):
+        return False
+    thumbcache.set(key, data, tag=f"{THUMB_TAG}/{image_format.lower()}", retry=True)
+    log.debug(f"thumbnail transcoded {len(raw_image)} -> {len(data)} bytes")
+    return True
+
+
+def schedule_transcode_thumbnail(key):
+    """transcode thumbnail in thread"""
+    if TRANSCODE_FORMAT or TRANSCODE_SRGB:
+        transcode_thread_pool.submit(transcode_thumbnail, key)
+
+
+@single_flight
+@memoize(thumbcache, name=THUMB_CALLABLE_NAME, tag=THUMB_TAG, on_store=schedule_transcode_thumbnail)
 def download_thumbnail(inode, cache_key, shared, passphrase):
     """get thumbnail using cache"""
     from photos_api import synofoto
 
-    if CACHE_PIXMAP:
+    with download_limiter.slot():
         raw_image = synofoto.api.thumbnail_download(inode, "sm", cache_key, shared, passphrase)
-        pixmap = QPixmap()
+    if CACHE_PIXMAP:
+        # stored decoded in sRGB (PNG). QImage only : QPixmap can't be used outside GUI thread
         image = QImage()
         image.loadFromData(raw_image)
-        colorspace = image.colorSpace()
-        if not colorspace.description().startswith("sRGB"):
-            srgbColorSpace = QColorSpace(QColorSpace.NamedColorSpace.SRgb)
-            image.convertToColorSpace(srgbColorSpace)
-        pixmap.convertFromImage(image)
+        to_srgb(image)
         # convert to bytes
         array = QByteArray()
         buffer = QBuffer(array)
         buffer.open(QIODeviceBase.OpenModeFlag.WriteOnly)
-        pixmap.save(buffer, "PNG")
+        image.save(buffer, "PNG")
         return array.data()
-    return synofoto.api.thumbnail_download(inode, "sm", cache_key, shared, passphrase)
+    return raw_image
 
 
-@photocache.memoize(name=THUMB_CALLABLE_NAME, tag="photo")
+@single_flight
+@memoize(photocache, name=THUMB_CALLABLE_NAME, tag="photo", renew_claim=True)
 def download_photo(inode, shared, passphrase):
     """get thumbnail using cache"""
     from photos_api import synofoto
 
-    return synofoto.api.photo_download(inode, shared, passphrase)
+    with download_limiter.slot(measure=False):
+        return synofoto.api.photo_download(inode, shared, passphrase)
+
+
+@single_flight
+@memoize(photocache, name=XL_CALLABLE_NAME, tag="xl", renew_claim=True)
+def download_thumbnail_xl(inode, cache_key, shared, passphrase):
+    """get large thumbnail (slideshow preview) using photos cache"""
+    from photos_api import synofoto
+
+    with download_limiter.slot(measure=False):
+        return synofoto.api.thumbnail_download(inode, "xl", cache_key, shared, passphrase)
+
+
+def cached_thumbnail(inode, cache_key, shared, passphrase) -> bytes | None:
+    """return thumbnail data if in cache, None otherwise (no download)"""
+    return thumbcache.get(download_thumbnail.__cache_key__(inode, cache_key, shared, passphrase), retry=True)
+
+
+def evict_thumbnail(inode, cache_key, shared, passphrase) -> bool:
+    """remove thumbnail from cache (corrupt data). Return True if evicted"""
+    if thumbcache.delete(download_thumbnail.__cache_key__(inode, cache_key, shared, passphrase), retry=True):
+        log.warning(f"corrupt thumbnail {inode} evicted from cache")
+        return True
+    return False
+
+
+def cached_photo_file(inode, shared, passphrase) -> str | None:
+    """return path of the file holding the cached photo, None if not cached in a standalone file
+
+    diskcache stores large values (> disk_min_file_size) as standalone files
+    """
+    key = download_photo.__cache_key__(inode, shared, passphrase)
+    handle = photocache.get(key, read=True, retry=True)
+    if not isinstance(handle, io.BufferedReader):
+        # not cached, or small value stored inline (returned as bytes or unpickled object)
+        return None
+    with handle:
+        return handle.name
+
+
+def read_image(reader: QImageReader, size: QSize | None = None) -> QImage:
+    """read image, decoded to fit in size if given (never enlarged) : jpeg decoder scales while decoding"""
+    if size is not None and size.isValid():
+        native = reader.size()
+        if native.isValid() and (native.width() > size.width() or native.height() > size.height()):
+            reader.setScaledSize(native.scaled(size, Qt.AspectRatioMode.KeepAspectRatio))
+    return reader.read()
+
+
+def read_image_data(data: bytes, size: QSize | None = None) -> QImage:
+    """decode image data, to fit in size if given (see read_image)"""
+    array = QByteArray(data)
+    buffer = QBuffer(array)
+    buffer.open(QIODeviceBase.OpenModeFlag.ReadOnly)
+    return read_image(QImageReader(buffer), size)
+
+
+def load_photo(inode, shared, passphrase, size: QSize | None = None) -> QImage:
+    """load photo in QImage using cache, decoded to fit in size if given
+
+    The cached file is given directly to the image decoder : no intermediate python bytes copy
+    """
+    path = cached_photo_file(inode, shared, passphrase)
+    if path is None:
+        # not in cache : download (and store in cache)
+        raw_image = download_photo(inode, shared, passphrase)
+        path = cached_photo_file(inode, shared, passphrase)
+        if path is None:
+            return read_image_data(raw_image, size)
+        # release downloaded bytes before decoding from file
+        del raw_image
+    image = read_image(QImageReader(path), size)
+    if image.isNull():
+        # file evicted from cache between lookup and read
+        image = read_image_data(download_photo(inode, shared, passphrase), size)
+    return image
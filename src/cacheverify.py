@@ -0,0 +1,116 @@
+"""
+Cache integrity verification and repair
+
+Scan cache entries in parallel, check image data (type, length, header, truncation),
+and evict corrupt entries : they heal on next download.
+
+Usage :
+    python cacheverify.py [--photos] [--full] [--dry-run] [--workers N]
+"""
+
+from __future__ import annotations
+import sys
+import logging
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from diskcache import Cache
+from PyQt6.QtCore import QCoreApplication, QByteArray, QBuffer, QIODeviceBase
+from PyQt6.QtGui import QImage, QImageReader
+
+from cache import thumbcache, photocache, CLAIM_TAG
+
+
+log = logging.getLogger(__name__)
+
+VERIFY_WORKERS = 4
+
+RESULT_OK = "ok"
+
+
+def _is_truncated(data: bytes, fmt: str) -> bool:
+    """cheap check of end of data for most common formats"""
+    if fmt in ["jpeg", "jpg"]:
+        return not data.rstrip(b"\x00").endswith(b"\xff\xd9")
+    if fmt == "png":
+        return not data.endswith(b"IEND\xaeB`\x82")
+    if fmt == "webp":
+        return data[:4] != b"RIFF" or int.from_bytes(data[4:8], "little") + 8 > len(data)
+    return False
+
+
+def check_image_data(data, strict: bool = True, full: bool = False) -> str | None:
+    """
+    check image data. Return reason if corrupt, None if valid
+
+        strict : data must be in an image format known by Qt, and end with its end marker
+                 (False for photos cache : may contain videos, originals may have trailing data as motion photos)
+        full : fully decode image (slow)
+    """
+    if not isinstance(data, bytes):
+        return "invalid type"
+    if not data:
+        return "empty"
+    array = QByteArray(data)
+    buffer = QBuffer(array)
+    buffer.open(QIODeviceBase.OpenModeFlag.ReadOnly)
+    reader = QImageReader(buffer)
+    if not reader.canRead():
+        return "unknown format" if strict else None
+    if not reader.size().isValid():
+        return "invalid header"
+    if strict and _is_truncated(data, bytes(reader.format().data()).decode().lower()):
+        return "truncated"
+    if full and QImage.fromData(data).isNull():
+        return "undecodable"
+    return None
+
+
+def verify_cache(
+    cache: Cache, strict: bool = True, full: bool = False, repair: bool = True, workers: int = VERIFY_WORKERS
+) -> Counter:
+    """verify all entries of cache, evict corrupt ones if repair. Return counts by result"""
+
+    def verify_key(key) -> str:
+        data = cache.get(key, retry=True)
+        if data is None:
+            # evicted meanwhile
+            return "missing"
+        reason = check_image_data(data, strict, full)
+        if reason is None:
+            return RESULT_OK
+        log.warning(f"cache entry {key} corrupt : {reason}")
+        if repair:
+            cache.delete(key, retry=True)
+        return reason
+
+    keys = [key for key in cache.iterkeys() if not (isinstance(key, tuple) and key and key[0] == CLAIM_TAG)]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="verify") as executor:
+        report = Counter(executor.map(verify_key, keys))
+    log.info(
+        f"cache {cache.directory} : {len(keys)} entries checked, {report[RESULT_OK]} valid, "
+        f"{len(keys) - report[RESULT_OK] - report['missing']} {'evicted' if repair else 'corrupt'} {dict(report)}"
+    )
+    return report
+
+
+def main(argv: list[str]) -> int:
+    """command line"""
+    parser = argparse.ArgumentParser(description="Verify and repair thumbnails/photos caches")
+    parser.add_argument("--photos", action="store_true", help="verify photos cache too")
+    parser.add_argument("--full", action="store_true", help="fully decode images (slow)")
+    parser.add_argument("--dry-run", action="store_true", help="report only, no eviction")
+    parser.add_argument("--workers", type=int, default=VERIFY_WORKERS, help="parallel checks")
+    args = parser.parse_args(argv)
+
+    verify_cache(thumbcache, True, args.full, not args.dry_run, args.workers)
+    if args.photos:
+        verify_cache(photocache, False, args.full, not args.dry_run, args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    app = QCoreApplication(sys.argv)
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,42 @@
+"""
+Conversion of images to sRGB, with color transforms cached
+
+Building the transform from an ICC profile (Display P3 photos from phones, Adobe RGB, ...) is costly :
+one QColorTransform is built by source colorspace and reused for all images (in any thread)
+"""
+
+import threading
+
+from PyQt6.QtGui import QImage, QColorSpace, QColorTransform
+
+SRGB = QColorSpace(QColorSpace.NamedColorSpace.SRgb)
+
+# source colorspace (ICC profile or description) -> transform to sRGB
+_transforms: dict[bytes | str, QColorTransform] = {}
+_lock = threading.Lock()
+
+
+def is_srgb(colorspace: QColorSpace) -> bool:
+    """return True if no conversion needed (sRGB or unknown colorspace)"""
+    return not colorspace.isValid() or colorspace.description().startswith("sRGB")
+
+
+def srgb_transform(colorspace: QColorSpace) -> QColorTransform:
+    """transform from colorspace to sRGB, built once by colorspace"""
+    key = bytes(colorspace.iccProfile()) or colorspace.description()
+    with _lock:
+        transform = _transforms.get(key)
+        if transform is None:
+            transform = colorspace.transformationToColorSpace(SRGB)
+            _transforms[key] = transform
+    return transform
+
+
+def to_srgb(image: QImage) -> QImage:
+    """convert image to sRGB colorspace if needed (image modified), return image"""
+    colorspace = image.colorSpace()
+    if is_srgb(colorspace):
+        return image
+    image.applyColorTransform(srgb_transform(colorspace))
+    image.setColorSpace(SRGB)
+    return image
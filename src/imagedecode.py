@@ -0,0 +1,162 @@
+"""
+Images decoding in threads
+
+QImage can be used in any thread, QPixmap only in GUI thread : images are decoded (and colorspace converted)
+by a pool of threads, only the QPixmap conversion is left to the GUI thread.
+
+    - decode_pool.submit(key, func, *args) : func returns a QImage, emitted with decode_pool.signal.decoded(key, image)
+    - decode_pool.submit_thumbnail(key, ...) : thumbnail missing in cache is downloaded first in the download pool,
+      decode threads only decode cached data
+    - consumers connect decoded signal (queued in GUI thread) and filter their own keys
+    - requests dropped (full queue, stale download) are emitted with decode_pool.signal.dropped(key)
+"""
+
+import logging
+import threading
+from collections import deque
+
+from PyQt6.QtCore import Qt, QObject, QSize, QRect, pyqtSignal
+from PyQt6.QtGui import QImage, QPainter, QColorConstants
+
+from cache import thumbcache, download_generations
+from cacheddownload import download_thumbnail, evict_thumbnail, cached_thumbnail
+from colortransform import to_srgb
+
+log = logging.getLogger(__name__)
+
+DECODE_WORKERS = 2
+# pending decodes : when full, oldest requests are dropped (newest are the visible ones)
+DECODE_QUEUE_SIZE = 64
+
+
+def decode_thumbnail(inode, cache_key, shared, passphrase, size: QSize = None) -> QImage:
+    """
+    thumbnail image from cache (no download), null if not available
+
+        size : if given, thumbnail scaled and centered in a black square of this size
+               (views use uniform item sizes)
+    """
+    raw_image = cached_thumbnail(inode, cache_key, shared, passphrase)
+    if raw_image is None:
+        return QImage()
+    image = QImage()
+    if not raw_image or not image.loadFromData(raw_image):
+        # empty or corrupt in cache : evict, next request will download again
+        evict_thumbnail(inode, cache_key, shared, passphrase)
+        return QImage()
+    image = to_srgb(image)
+    if size is None:
+        return image
+    image = image.scaled(size, Qt.AspectRatioMode.KeepAspectRatio)
+    square = QImage(size, QImage.Format.Format_ARGB32_Premultiplied)
+    square.fill(QColorConstants.Black)
+    painter = QPainter(square)
+    rect = QRect(0, 0, image.width(), image.height())
+    rect.translate((size.width() - image.width()) // 2, (size.height() - image.height()) // 2)
+    painter.drawImage(rect, image)
+    painter.end()
+    return square
+
+
+class DecodeSignal(QObject):
+    """signals emitted from decode threads"""
+
+    # (key, image), image null on failure
+    decoded = pyqtSignal(object, QImage)
+    # key of request dropped (queue full, download of a previous generation) : never decoded
+    dropped = pyqtSignal(object)
+
+
+class DecodePool:
+    """
+    Threads decoding images, bounded queue of pending requests (last in, first decoded)
+
+    Threads are started on first request
+    """
+
+    def __init__(self, workers: int = DECODE_WORKERS, queue_size: int = DECODE_QUEUE_SIZE):
+        self.signal = DecodeSignal()
+        self._workers = workers
+        self._queue_size = queue_size
+        self._queue = deque()
+        # keys pending or in progress : a key is decoded once at a time
+        self._keys = set()
+        # keys waiting for thumbnail download -> download generation
+        self._downloads = {}
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def submit(self, key, func, *args) -> None:
+        """request func(*args) -> QImage in thread, result emitted with key. Ignored if key already pending"""
+        with self._cond:
+            if key in self._keys:
+                return
+            if not self._threads:
+                for num in range(self._workers):
+                    thread = threading.Thread(target=self._run, name=f"decode_{num}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+            self._queue.append((key, func, args))
+            self._keys.add(key)
+            dropped = []
+            while len(self._queue) > self._queue_size:
+                dropped.append(self._queue.popleft()[0])
+                self._keys.discard(dropped[-1])
+            self._cond.notify()
+        for dropped_key in dropped:
+            self.signal.dropped.emit(dropped_key)
+
+    def submit_thumbnail(
+        self, key, inode, cache_key, shared, passphrase, size: QSize = None, download: bool = True
+    ) -> None:
+        """
+        request thumbnail decode (see decode_thumbnail), result emitted with key
+
+            download : thumbnail missing in cache is downloaded first in download pool (current generation)
+        """
+        args = (inode, cache_key, shared, passphrase, size)
+        thumb_key = download_thumbnail.__cache_key__(inode, cache_key, shared, passphrase)
+        if not download or thumb_key in thumbcache:
+            self.submit(key, decode_thumbnail, *args)
+            return
+        generation = download_generations.current()
+        with self._cond:
+            # a download of a previous generation may be dropped : requested again
+            if key in self._keys or self._downloads.get(key) == generation:
+                return
+            self._downloads[key] = generation
+
+        def downloaded(_future):
+            with self._cond:
+                if self._downloads.get(key) != generation:
+                    # key requested again in a newer generation
+                    return
+                del self._downloads[key]
+            if thumb_key in thumbcache or download_generations.is_current(generation):
+                # decoded, null image if download failed
+                self.submit(key, decode_thumbnail, *args)
+            else:
+                # stale download dropped : consumer requests again if still needed
+                self.signal.dropped.emit(key)
+
+        future = download_generations.submit(generation, download_thumbnail, inode, cache_key, shared, passphrase)
+        future.add_done_callback(downloaded)
+
+    def _run(self) -> None:
+        """decode thread"""
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                key, func, args = self._queue.pop()
+            try:
+                image = func(*args)
+            except Exception as _e:
+                log.warning(f"decode {key} failed : {_e}")
+                image = QImage()
+            with self._cond:
+                self._keys.discard(key)
+            self.signal.decoded.emit(key, image)
+
+
+decode_pool = DecodePool()
@@ -1,31 +1,75 @@
 """
     ImageWidget resizable to parent size
+
+    While resizing, image is fast scaled, then smooth scaled when size is stable.
+    Last smooth scaled images are kept by size.
 """
+from collections import OrderedDict
+
 from PyQt6.QtWidgets import QLabel
 from PyQt6.QtGui import QPixmap, QResizeEvent
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
+
+# delay (ms) without resize before smooth scaling
+SMOOTH_SCALE_DELAY = 150
+# number of smooth scaled images kept
+SCALED_CACHE_SIZE = 4
 
 
 class ImageWidget(QLabel):
     def __init__(self, parent, img: QPixmap = None):
         super().__init__(parent)
-        if img is None:
-            img = QPixmap()
-        self.img = img
+        self.img = QPixmap()
+        # dim -> smooth scaled pixmap of self.img
+        self._scaled = OrderedDict()
+        self._smoothTimer = QTimer(self)
+        self._smoothTimer.setSingleShot(True)
+        self._smoothTimer.setInterval(SMOOTH_SCALE_DELAY)
+        self._smoothTimer.timeout.connect(self.__smoothScale)
         self.setImage(img)
         self.setStyleSheet("background-color: black;")
         self.setMinimumSize(50, 50)
 
     def setImage(self, img):
-        self.img = QPixmap(img)
+        self.img = img if img is not None else QPixmap()
+        self._scaled.clear()
+        self._smoothTimer.stop()
         if self.img.isNull():
             self.setPixmap(self.img)
             return
-        dim = min(self.parent().width(), self.parent().height())
-        self.setPixmap(self.img.scaled(dim, dim, Qt.AspectRatioMode.KeepAspectRatio))
+        self.__smoothScale()
 
     def resizeEvent(self, event: QResizeEvent):
         if self.img.isNull():
             return
-        dim = min(self.parent().width(), self.parent().height())
-        self.setPixmap(self.img.scaled(dim, dim, Qt.AspectRatioMode.KeepAspectRatio))
+        dim = self.__dim()
+        scaled = self._scaled.get(dim)
+        if scaled is not None:
+            self._scaled.move_to_end(dim)
+            self._smoothTimer.stop()
+            self.setPixmap(scaled)
+            return
+        self.setPixmap(
+            self.img.scaled(dim, dim, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.FastTransformation)
+        )
+        self._smoothTimer.start()
+
+    def __dim(self) -> int:
+        """size of square image"""
+        return min(self.parent().width(), self.parent().height())
+
+    def __smoothScale(self):
+        """smooth scale image to current size, kept in cache"""
+        if self.img.isNull():
+            return
+        dim = self.__dim()
+        scaled = self._scaled.get(dim)
+        if scaled is None:
+            scaled = self.img.scaled(
+                dim, dim, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
+            )
+            self._scaled[dim] = scaled
+            while len(self._scaled) > SCALED_CACHE_SIZE:
+                self._scaled.popitem(last=False)
+        self._scaled.move_to_end(dim)
+        self.setPixmap(scaled)
@@ -1,7 +1,7 @@
 """
 Encapsulate Synology Photos API
 
-A fake API is set when login failed
+A fake API is set when login failed, and while login is in progress
 
 """
 
@@ -12,6 +12,8 @@ from synology_photos_api.exceptions import PhotosError
 
 from synology_photos_api.exceptions import SynoBaseException
 
+from cache import metacache, restrict_access
+
 log = logging.getLogger(__name__)
 
 
@@ -53,12 +55,18 @@ class PhotosAPI:
         dsm_version: int = 7,
         debug: bool = True,
         otp_code: Optional[str] = None,
+        reuse_session: bool = False,
     ) -> bool:
+        """login, may be called from a thread : api is set only when ready (fake API meanwhile)"""
         try:
             if self.connected:
                 self.api.logout()
             self.connected = False
-            self.api = Photos(
+            self.api = PhotosFakeEmpty()
+            if reuse_session:
+                # session id kept in metadata cache : no access for other users
+                restrict_access(metacache)
+            api = Photos(
                 ip_address,
                 port,
                 username,
@@ -68,25 +76,32 @@ class PhotosAPI:
                 dsm_version,
                 debug,
                 otp_code,
+                metadata=metacache,
+                reuse_session=reuse_session,
             )
-            self.connected = True
         except Exception as _e:
             if isinstance(_e, SynoBaseException):
                 self.exception = str(_e.error_message)
             else:
                 self.exception = str(_e)
-            self.api = PhotosFakeEmpty()
-            return
+            return False
         # now we are connected, but sometimes, a exception occurs on first api call with :
         #   (err 119 [Invalid session / SID not found.]) Error 119 - Invalid session / SID not found
-        # so try to get user_info for test
+        # requests do a re-login on session errors, so try to get user_info for test : a failure is persistent
+        # (also checks a reused session : re-login if expired)
         try:
-            self.api.get_userinfo()
+            api.get_userinfo()
         except PhotosError as _e:
-            self.connected = False
             self.exception = str(_e.error_message)
-            self.api.logout()
-            self.api = PhotosFakeEmpty()
+            api.logout()
+            return False
+        if reuse_session:
+            # files created with the session id written
+            restrict_access(metacache)
+        self.exception = None
+        self.api = api
+        self.connected = True
+        return True
 
     def is_connected(self) -> bool:
         return self.connected
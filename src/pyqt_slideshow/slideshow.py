@@ -114,6 +114,10 @@ class SlideShow(QWidget):
         """
         self.__view.setImage(photo)
 
+    def prefetch(self, nodes):
+        """load in background photos (SynoNode list) likely shown next, others are released"""
+        self.__view.prefetch(nodes)
+
     def setNavigationButtonVisible(self, f: bool):
         self.__navWidget.setVisible(f)
 
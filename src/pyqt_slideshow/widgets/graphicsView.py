@@ -1,5 +1,10 @@
-from PyQt6.QtCore import Qt, QPropertyAnimation, QObject
-from PyQt6.QtGui import QPixmap, QImage, QColor, QColorSpace, QBrush, QRadialGradient, QAction
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import Qt, QPropertyAnimation, QObject, QSize, QTimer, pyqtSignal
+from PyQt6.QtGui import QPixmap, QImage, QColor, QBrush, QRadialGradient, QAction
 from PyQt6.QtWidgets import QGraphicsScene, QGraphicsView, QGraphicsOpacityEffect, QGraphicsProxyWidget, QFrame
 
 
@@ -11,14 +16,80 @@ from synophotosmodel import (
 )
 
 from photos_api import synofoto
-from cacheddownload import download_photo
+from cacheddownload import load_photo, download_thumbnail_xl
+from imagedecode import decode_pool
+from colortransform import to_srgb
+
+log = logging.getLogger(__name__)
+
+# progressive loading of slides (xl thumbnail, then original) : 2 threads, a slow original does not block next slide
+slide_thread_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="slide")
+# look-ahead loading of next slides
+prefetch_thread_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+
+
+def isEnlarged(size: QSize, target: QSize) -> bool:
+    """return True if image of size is enlarged to fit in target"""
+    return size.scaled(target, Qt.AspectRatioMode.KeepAspectRatio).width() > size.width()
+
+
+def loadSlide(target: QSize, inode, cache_key, shared, passphrase, isStale, onPreview=None):
+    """
+    load image for display size target : xl thumbnail, then original if xl thumbnail would be enlarged
+    (no Qt widget call : executed in thread)
+
+    Original is decoded at target size (not native size), colorspace converted after downscale
+
+        isStale : callable, True when load is no more needed
+        onPreview : optional callable(image) called with xl thumbnail when original follows
+    Return (image, complete), (None, False) if stale. complete is False when a larger decode is possible
+    """
+    if cache_key is not None:
+        if isStale():
+            return None, False
+        try:
+            image = to_srgb(QImage.fromData(download_thumbnail_xl(inode, cache_key, shared, passphrase) or b""))
+        except Exception as _e:
+            # xl thumbnail missing or not generated yet : original only
+            log.warning(f"xl thumbnail {inode} failed : {_e}")
+            image = QImage()
+        if not image.isNull():
+            if not isEnlarged(image.size(), target):
+                return image, False
+            if onPreview is not None and not isStale():
+                onPreview(image)
+    if isStale():
+        return None, False
+    image = to_srgb(load_photo(inode, shared, passphrase, target))
+    # smaller than target : native size
+    return image, image.width() < target.width() and image.height() < target.height()
 
 
 class SingleImageGraphicsView(QGraphicsView):
+    # image loaded in thread : (load token, image, complete)
+    imageLoaded = pyqtSignal(int, QImage, bool)
+
     def __init__(self):
         super().__init__()
         self.__aspectRatioMode = Qt.AspectRatioMode.KeepAspectRatio
         self.__gradient_enabled = False
+        # incremented on each setImage : loads of previous images are dropped
+        self._token = 0
+        self.imageLoaded.connect(self.__onImageLoaded)
+        decode_pool.signal.decoded.connect(self.__onThumbnailDecoded)
+        # prefetch : images ready to show by inode (insertion order), generation incremented on each prefetch
+        self._ready: OrderedDict[int, tuple[QSize, QImage]] = OrderedDict()
+        self._readyLock = threading.Lock()
+        self._prefetchGeneration = 0
+        self._prefetchSize = 0
+        # current slide : load arguments, image shown is complete (no larger decode)
+        self._slide = None
+        self._slideComplete = True
+        # decode again at larger size when enlarged (debounced)
+        self._redecodeTimer = QTimer(self)
+        self._redecodeTimer.setSingleShot(True)
+        self._redecodeTimer.setInterval(300)
+        self._redecodeTimer.timeout.connect(self.__redecodeIfEnlarged)
         self.__initVal()
 
     def __initVal(self):
@@ -27,27 +98,130 @@ class SingleImageGraphicsView(QGraphicsView):
         self._item = ""
 
     def setImage(self, image: QPixmap | SynoNode):
-        """set image pixmap"""
+        """set image pixmap
+
+        For a node, progressive display : prefetched image, or cached thumbnail at once, then xl thumbnail,
+        then original if display is larger than xl thumbnail (both loaded in thread)
+        """
+        self._token += 1
+        self._slide = None
+        self._slideComplete = True
         if isinstance(image, SynoNode):
             node = image
-            pixmap = QPixmap()
-            image = QImage()
-            raw_image = download_photo(node.inode, node.isShared(), node.passphrase())
-            image.loadFromData(raw_image)
-            colorspace = image.colorSpace()
-            if not colorspace.description().startswith("sRGB"):
-                srgbColorSpace = QColorSpace(QColorSpace.NamedColorSpace.SRgb)
-                image.convertToColorSpace(srgbColorSpace)
-            pixmap.convertFromImage(image)
-            image = pixmap
-
-        self._p = image
+            target = self.__targetSize()
+            self._slide = (node.inode, self.__cacheKey(node), node.isShared(), node.passphrase())
+            ready = self.__readyImage(node.inode, target)
+            if ready is not None:
+                self._slideComplete = ready[1]
+                self.__showPixmap(QPixmap.fromImage(ready[0]))
+                return
+            # cached thumbnail decoded in thread, meanwhile blank
+            decode_pool.submit_thumbnail(("slide", id(self), self._token), *self._slide, download=False)
+            self._slideComplete = False
+            slide_thread_pool.submit(self.__load, self._token, target, *self._slide)
+            image = QPixmap()
+        self.__showPixmap(image)
+
+    def prefetch(self, nodes: list[SynoNode]):
+        """
+        load and decode nodes images in thread, ready for setImage.
+        Images of nodes not in list are released, pending loads of previous call are cancelled
+        """
+        self._prefetchGeneration += 1
+        generation = self._prefetchGeneration
+        self._prefetchSize = len(nodes)
+        inodes = {node.inode for node in nodes}
+        with self._readyLock:
+            for inode in [inode for inode in self._ready if inode not in inodes]:
+                del self._ready[inode]
+            pending = [node for node in nodes if node.inode not in self._ready]
+        target = self.__targetSize()
+        for node in pending:
+            prefetch_thread_pool.submit(
+                self.__prefetchLoad,
+                generation,
+                target,
+                node.inode,
+                self.__cacheKey(node),
+                node.isShared(),
+                node.passphrase(),
+            )
+
+    def __targetSize(self) -> QSize:
+        return self.viewport().size() * self.devicePixelRatioF()
+
+    @staticmethod
+    def __cacheKey(node: SynoNode):
+        return node.rawData().get("additional", {}).get("thumbnail", {}).get("cache_key")
+
+    def __readyImage(self, inode, target: QSize) -> tuple[QImage, bool] | None:
+        """prefetched (image, complete), if loaded for this display size"""
+        with self._readyLock:
+            ready = self._ready.get(inode)
+        if ready is None or ready[0] != target:
+            return None
+        return ready[1:]
+
+    def __prefetchLoad(self, generation: int, target: QSize, inode, cache_key, shared, passphrase):
+        """prefetch in thread"""
+        isStale = lambda: generation != self._prefetchGeneration
+        try:
+            image, complete = loadSlide(target, inode, cache_key, shared, passphrase, isStale)
+        except Exception as _e:
+            log.warning(f"slide {inode} prefetch failed : {_e}")
+            return
+        if image is None or image.isNull():
+            return
+        with self._readyLock:
+            if isStale():
+                return
+            self._ready[inode] = (target, image, complete)
+            # bounded ring : oldest released
+            while len(self._ready) > self._prefetchSize:
+                self._ready.popitem(last=False)
+
+    def __showPixmap(self, pixmap: QPixmap):
+        self._p = pixmap
         self._scene = QGraphicsScene()
         self._item = self._scene.addPixmap(self._p)
 
         self.setScene(self._scene)
         self.fitInView(self._item, self.__aspectRatioMode)
 
+    def __load(self, token: int, target: QSize, inode, cache_key, shared, passphrase):
+        """load in thread : xl thumbnail, then original if needed. Stop when a new image is set"""
+        try:
+            isStale = lambda: token != self._token
+            onPreview = lambda xl: self.imageLoaded.emit(token, xl, False)
+            image, complete = loadSlide(target, inode, cache_key, shared, passphrase, isStale, onPreview)
+            if image is not None:
+                self.imageLoaded.emit(token, image, complete)
+        except RuntimeError:
+            # widget deleted (slideshow recreated)
+            pass
+        except Exception as _e:
+            log.warning(f"slide {inode} load failed : {_e}")
+
+    def __onImageLoaded(self, token: int, image: QImage, complete: bool):
+        if token == self._token and not image.isNull():
+            self._slideComplete = complete
+            self.__showPixmap(QPixmap.fromImage(image))
+
+    def __onThumbnailDecoded(self, key, image: QImage):
+        """cached thumbnail decoded : shown if nothing better yet"""
+        if key == ("slide", id(self), self._token) and self._p.isNull() and not image.isNull():
+            self.__showPixmap(QPixmap.fromImage(image))
+
+    def __redecodeIfEnlarged(self):
+        """view enlarged : load again current slide at new size, if image shown would be enlarged"""
+        if self._slide is None or self._slideComplete or self._p.isNull():
+            return
+        target = self.__targetSize()
+        if not isEnlarged(self._p.size(), target):
+            return
+        self._token += 1
+        slide_thread_pool.submit(self.__load, self._token, target, *self._slide)
+
     def setAspectRatioMode(self, mode):
         self.__aspectRatioMode = mode
 
@@ -63,6 +237,7 @@ class SingleImageGraphicsView(QGraphicsView):
         self.setForegroundBrush(brush)
 
     def resizeEvent(self, e):
+        self._redecodeTimer.start()
         if self._item:
             self.fitInView(self.sceneRect(), self.__aspectRatioMode)
             if self.__gradient_enabled:
@@ -1,6 +1,10 @@
 # fmt: off
 from __future__ import annotations
-from typing import Optional
+from typing import Optional, MutableMapping
+from collections import Counter
+import threading
+import random
+import time
 import requests
 import json
 from .error_codes import error_codes, CODE_SUCCESS, download_station_error_codes, file_station_error_codes
@@ -16,6 +20,28 @@ from .exceptions import UniversalSearchError, USBCopyError, VPNError, CoreSysInf
 
 USE_EXCEPTIONS: bool = True
 
+# requests timeout (connect, read) in seconds
+REQUEST_TIMEOUT: tuple[float, float] = (10, 60)
+# retries of idempotent requests on transient errors (connection, timeout, server busy)
+RETRY_COUNT: int = 3
+RETRY_BACKOFF: float = 0.5
+RETRY_BACKOFF_MAX: float = 8
+RETRY_HTTP_STATUS: tuple[int, ...] = (429, 502, 503, 504)
+# API methods without side effect, safe to send again
+IDEMPOTENT_METHODS: tuple[str, ...] = ('list', 'get', 'count', 'download', 'suggest', 'me', 'query', 'search')
+# session errors : 106 session timeout, 107 duplicate login, 119 SID not found
+SESSION_ERROR_CODES: tuple[int, ...] = (106, 107, 119)
+# API errors when catalogue is outdated : 102 API does not exist, 103 method does not exist, 104 version not supported
+API_INFO_ERROR_CODES: tuple[int, ...] = (102, 103, 104)
+# keys in api_cache mapping :
+#   ("apiinfo", base url, dsm version) -> (time, SYNO.API.Info catalogue)
+#   ("session", base url, username, application) -> (time, sid, syno token)
+API_INFO_KEY: str = 'apiinfo'
+API_INFO_TTL: float = 24 * 3600
+SESSION_KEY: str = 'session'
+# a kept session id gives access to the NAS : kept at most this delay (seconds), as an interactive DSM session
+SESSION_TTL: float = 8 * 3600
+
 class Authentication:
     def __init__(self,
                  ip_address: str,
@@ -26,7 +52,9 @@ class Authentication:
                  cert_verify: bool = False,
                  dsm_version: int = 7,
                  debug: bool = True,
-                 otp_code: Optional[str] = None
+                 otp_code: Optional[str] = None,
+                 api_cache: Optional[MutableMapping] = None,
+                 reuse_session: bool = False
                  ) -> None:
         self._ip_address: str = ip_address
         self._port: str = port
@@ -46,12 +74,23 @@ class Authentication:
 
         self.full_api_list = {}
         self.app_api_list = {}
+
+        # application of last login, used for re-login on session errors
+        self._application: Optional[str] = None
+        # only one re-login for all threads
+        self._login_lock = threading.Lock()
+        # requests metrics : requests, retries, relogins, failures
+        self.request_stats: Counter = Counter()
+        # persistent mapping for API catalogue and, if reuse_session, session ids (see login)
+        self._api_cache: Optional[MutableMapping] = api_cache
+        self._reuse_session: bool = reuse_session and api_cache is not None
         return
 
     def verify_cert_enabled(self) -> bool:
         return self._verify
 
     def login(self, application: str) -> None:
+        self._application = application
         login_api = 'auth.cgi?api=SYNO.API.Auth'
         params = {'version': self._version, 'method': 'login', 'account': self._username,
                   'passwd': self._password, 'session': application, 'format': 'cookie', 'enable_syno_token':'yes'}
@@ -62,23 +101,31 @@ class Authentication:
             self._session_expire = False
             if self._debug is True:
                 print('User already logged in')
+        elif self._reuse_session and self._kept_session(application) is not None:
+            # session of a previous launch, checked by first request : re-login on session error
+            self._sid, self._syno_token = self._kept_session(application)
+            self._session_expire = False
+            if self._debug is True:
+                print('User logged in, previous session reused')
         else:
             # Check request for error:
             session_request_json: dict[str, object] = {}
             if USE_EXCEPTIONS:
                 try:
-                    session_request = requests.get(self._base_url + login_api, params, verify=self._verify)
+                    session_request = requests.get(self._base_url + login_api, params, verify=self._verify,
+                                                   timeout=REQUEST_TIMEOUT)
                     session_request.raise_for_status()
                     session_request_json = session_request.json()
-                except requests.exceptions.ConnectionError as e:
-                    raise SynoConnectionError(error_message=e.args[0])
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    raise SynoConnectionError(error_message=str(e))
                 except requests.exceptions.HTTPError as e:
                     raise HTTPError(error_message=str(e.args))
                 except requests.exceptions.JSONDecodeError as e:
                     raise JSONDecodeError(error_message=str(e.args))
             else:
                 # Will raise its own errors:
-                session_request = requests.get(self._base_url + login_api, params, verify=self._verify)
+                session_request = requests.get(self._base_url + login_api, params, verify=self._verify,
+                                               timeout=REQUEST_TIMEOUT)
                 session_request_json = session_request.json()
 
             # Check dsm response for error:
@@ -87,6 +134,8 @@ class Authentication:
                 self._sid = session_request_json['data']['sid']
                 self._syno_token = session_request_json['data']['synotoken']
                 self._session_expire = False
+                if self._reuse_session:
+                    self._keep_session(application)
                 if self._debug is True:
                     print('User logged in, new session started!')
             else:
@@ -97,6 +146,59 @@ class Authentication:
                     raise LoginError(error_code=error.code())
         return
 
+    def relogin(self, expired_sid: Optional[str]) -> None:
+        """new login after a session error. Done once when several threads get the error for the same session"""
+        with self._login_lock:
+            if self._sid is not None and self._sid != expired_sid:
+                # already renewed by another thread
+                return
+            self._session_expire = True
+            self._forget_session(self._application)
+            self.request_stats['relogins'] += 1
+            if self._debug is True:
+                print('Session expired, login again')
+            self.login(self._application)
+
+    def _session_key(self, application: str) -> tuple:
+        return (SESSION_KEY, self._base_url, self._username, application)
+
+    def _kept_session(self, application: str) -> Optional[tuple[str, str]]:
+        """(sid, syno token) kept by a previous login, None if none or older than SESSION_TTL"""
+        kept = self._api_cache.get(self._session_key(application))
+        if not isinstance(kept, tuple) or len(kept) != 3:
+            return None
+        if time.time() - kept[0] >= SESSION_TTL:
+            self._forget_session(application)
+            return None
+        return kept[1], kept[2]
+
+    def _keep_session(self, application: str) -> None:
+        key = self._session_key(application)
+        value = (time.time(), self._sid, self._syno_token)
+        if hasattr(self._api_cache, 'set'):
+            # diskcache : entry removed from storage when expired
+            self._api_cache.set(key, value, expire=SESSION_TTL)
+        else:
+            self._api_cache[key] = value
+
+    def _forget_session(self, application: Optional[str]) -> None:
+        if self._reuse_session:
+            self._api_cache.pop(self._session_key(application), None)
+
+    def _retry_wait(self, attempt: int, reason: str) -> None:
+        """wait before retry, exponential backoff with full jitter"""
+        self.request_stats['retries'] += 1
+        delay = random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2 ** attempt))
+        if self._debug is True:
+            print(f'Request failed ({reason}), retry {attempt}/{RETRY_COUNT} in {delay:.2f}s')
+        time.sleep(delay)
+
+    def _send(self, method: str, url: str, req_param: dict[str, object]) -> requests.Response:
+        headers = {"X-SYNO-TOKEN": self._syno_token}
+        if method == 'get':
+            return requests.get(url, req_param, verify=self._verify, headers=headers, timeout=REQUEST_TIMEOUT)
+        return requests.post(url, req_param, verify=self._verify, headers=headers, timeout=REQUEST_TIMEOUT)
+
     def logout(self, application: str) -> None:
         logout_api = 'auth.cgi?api=SYNO.API.Auth'
         param = {'version': self._version, 'method': 'logout', 'session': application}
@@ -116,6 +218,7 @@ class Authentication:
         else:
             response = requests.get(self._base_url + logout_api, param, verify=self._verify)
             error = self._get_error_code(response.json())
+        self._forget_session(self._application)
         self._session_expire = True
         self._sid = None
         if self._debug is True:
@@ -129,6 +232,28 @@ class Authentication:
         return
 
     def get_api_list(self, app: Optional[str] = None) -> None:
+        # one catalogue query for all apps, kept in api_cache
+        if not self.full_api_list:
+            self.full_api_list = self._query_api_list()
+        if app is not None:
+            for key in self.full_api_list:
+                if app.lower() in key.lower():
+                    self.app_api_list[key] = self.full_api_list[key]
+        return
+
+    def forget_api_list(self) -> None:
+        """drop catalogue kept in api_cache, queried again on next launch"""
+        if self._api_cache is not None:
+            self._api_cache.pop(self._api_info_key(), None)
+
+    def _api_info_key(self) -> tuple:
+        return (API_INFO_KEY, self._base_url, self._version)
+
+    def _query_api_list(self) -> dict[str, object]:
+        if self._api_cache is not None:
+            cached = self._api_cache.get(self._api_info_key())
+            if cached is not None and time.time() - cached[0] < API_INFO_TTL:
+                return cached[1]
         query_path = 'query.cgi?api=SYNO.API.Info'
         list_query = {'version': '1', 'method': 'query', 'query': 'all'}
 
@@ -148,14 +273,9 @@ class Authentication:
             # Will raise its own errors:
             response_json = requests.get(self._base_url + query_path, list_query, verify=self._verify).json()
 
-        if app is not None:
-            for key in response_json['data']:
-                if app.lower() in key.lower():
-                    self.app_api_list[key] = response_json['data'][key]
-        else:
-            self.full_api_list = response_json['data']
-
-        return
+        if self._api_cache is not None and 'data' in response_json:
+            self._api_cache[self._api_info_key()] = (time.time(), response_json['data'])
+        return response_json['data']
 
     def show_api_name_list(self) -> None:
         prev_key = ''
@@ -256,48 +376,71 @@ class Authentication:
         if method is None:
             method = 'get'
 
-        req_param['_sid'] = self._sid
-
         url = ('%s%s' % (self._base_url, api_path)) + '?api=' + api_name
 
-        # Do request and check for error:
-        response: Optional[requests.Response] = None
-        if USE_EXCEPTIONS:
-            # Catch and raise our own errors:
-            try:
-                if method == 'get':
-                    response = requests.get(url, req_param, verify=self._verify, headers={"X-SYNO-TOKEN":self._syno_token})
-                elif method == 'post':
-                    response = requests.post(url, req_param, verify=self._verify, headers={"X-SYNO-TOKEN":self._syno_token})
-            except requests.exceptions.ConnectionError as e:
-                raise SynoConnectionError(error_message=e.args[0])
-            except requests.exceptions.HTTPError as e:
-                raise HTTPError(error_message=str(e.args))
-        else:
-            # Will raise its own error:
-            if method == 'get':
-                response = requests.get(url, req_param, verify=self._verify, headers={"X-SYNO-TOKEN":self._syno_token})
-            elif method == 'post':
-                response = requests.post(url, req_param, verify=self._verify, headers={"X-SYNO-TOKEN":self._syno_token})
-
-        # Check for error response from dsm:
-        error = APIError()
-        if response_json:
+        # Idempotent requests are sent again on transient errors. A request rejected for session error
+        # was not executed : it is sent again (whatever its method) after one re-login
+        idempotent = str(req_param.get('method', '')).startswith(IDEMPOTENT_METHODS)
+        attempt = 0
+        relogged = False
+        while True:
+            self.request_stats['requests'] += 1
+            sid = self._sid
+            req_param['_sid'] = sid
+
+            # Do request and check for error:
+            response: Optional[requests.Response] = None
             if USE_EXCEPTIONS:
-                # Catch a JSON Decode error:
+                # Catch and raise our own errors:
                 try:
-                    error = self._get_error_code(response.json())
-                except requests.exceptions.JSONDecodeError:
-                    pass
+                    response = self._send(method, url, req_param)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    if idempotent and attempt < RETRY_COUNT:
+                        attempt += 1
+                        self._retry_wait(attempt, type(e).__name__)
+                        continue
+                    self.request_stats['failures'] += 1
+                    raise SynoConnectionError(error_message=str(e))
+                except requests.exceptions.HTTPError as e:
+                    self.request_stats['failures'] += 1
+                    raise HTTPError(error_message=str(e.args))
             else:
                 # Will raise its own error:
-                error = self._get_error_code(response.json())
-        else:
-            if response._content[: len('{"error"')] == b'{"error"':
-                error = self._get_error_code(json.loads(response._content.decode()))
-        
+                response = self._send(method, url, req_param)
+
+            if response.status_code in RETRY_HTTP_STATUS and idempotent and attempt < RETRY_COUNT:
+                attempt += 1
+                self._retry_wait(attempt, f'HTTP {response.status_code}')
+                continue
+
+            # Check for error response from dsm:
+            error = APIError()
+            if response_json:
+                if USE_EXCEPTIONS:
+                    # Catch a JSON Decode error:
+                    try:
+                        error = self._get_error_code(response.json())
+                    except requests.exceptions.JSONDecodeError:
+                        pass
+                else:
+                    # Will raise its own error:
+                    error = self._get_error_code(response.json())
+            else:
+                if response._content[: len('{"error"')] == b'{"error"':
+                    error = self._get_error_code(json.loads(response._content.decode()))
+
+            if error.code() in SESSION_ERROR_CODES and not relogged and self._application is not None:
+                relogged = True
+                self.relogin(sid)
+                continue
+            break
+
         error_code = error.code()
         if error_code:
+            self.request_stats['failures'] += 1
+            if error_code in API_INFO_ERROR_CODES:
+                # DSM or package may have been updated since catalogue was kept
+                self.forget_api_list()
             if self._debug is True:
                 print('Data request failed: ' + self._get_error_message(error, api_name))
 
@@ -1,4 +1,4 @@
-from typing import Optional, Any
+from typing import Optional, Any, MutableMapping
 from . import auth as syn
 
 
@@ -12,11 +12,13 @@ class BaseApi(object):
                  cert_verify: bool = False,
                  dsm_version: int = 7,
                  debug: bool = True,
-                 otp_code: Optional[str] = None
+                 otp_code: Optional[str] = None,
+                 api_cache: Optional[MutableMapping] = None,
+                 reuse_session: bool = False
                  ) -> None:
 
         self.session: syn.Authentication = syn.Authentication(ip_address, port, username, password, secure, cert_verify,
-                                                              dsm_version, debug, otp_code)
+                                                              dsm_version, debug, otp_code, api_cache, reuse_session)
         self.session.login('Core')
         self.session.get_api_list('Core')
         self.session.get_api_list()
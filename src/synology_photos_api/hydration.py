@@ -0,0 +1,122 @@
+"""
+Batched photos details requests
+
+    - class Hydrator : accumulates photo id requests during a short window,
+      and resolves them with a few bulk `photos_from_ids` calls
+
+"""
+from __future__ import annotations
+from typing import Optional, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+
+# requests accumulation delay (seconds)
+HYDRATION_WINDOW = 0.02
+# maximum ids by photos_from_ids call
+HYDRATION_CHUNK = 1000
+# concurrent photos_from_ids calls
+HYDRATION_WORKERS = 4
+
+
+class Hydrator:
+    """Photos details by identifier, with requests batched
+
+    Requests from all threads during `window` are grouped by (team, passphrase, additional)
+    and sent as chunked `photos_from_ids` calls, in parallel.
+    Each request gets a future resolved with the photo dict, or None if not found in space.
+
+    ``` python
+        photo = photos.hydrator.get(80716, team=False, additional=["thumbnail"])
+    ```
+    """
+
+    def __init__(
+        self,
+        photos: Any,
+        window: float = HYDRATION_WINDOW,
+        chunk: int = HYDRATION_CHUNK,
+        workers: int = HYDRATION_WORKERS,
+    ) -> None:
+        self._photos = photos
+        self._window = window
+        self._chunk = chunk
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hydrate")
+        self._lock = threading.Lock()
+        # (team, passphrase, additional) -> {photo_id: [futures]}
+        self._pending: dict[tuple, dict[int, list[Future]]] = {}
+        self._timer: Optional[threading.Timer] = None
+
+    def request(
+        self, photo_id: int, team: bool = False, passphrase: Optional[str] = None, additional: list[str] = None
+    ) -> Future:
+        """Request photo details
+        ### Parameters
+            photo_id : photo identifier
+            team : personal or shared space
+            passphrase : needed for photo in album "shared with me"
+            additional : list of additional fields
+        ### Return
+            future of photo dict (None if not found)
+        """
+        future = Future()
+        group = (bool(team), passphrase or None, tuple(sorted(additional or [])))
+        with self._lock:
+            self._pending.setdefault(group, {}).setdefault(photo_id, []).append(future)
+            if self._timer is None:
+                self._timer = threading.Timer(self._window, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return future
+
+    def get(
+        self,
+        photo_id: int,
+        team: bool = False,
+        passphrase: Optional[str] = None,
+        additional: list[str] = None,
+        timeout: Optional[float] = None,
+    ) -> dict[str, object] | None:
+        """Get photo details (None if not found), see `request`"""
+        return self.request(photo_id, team, passphrase, additional).result(timeout)
+
+    def get_many(
+        self,
+        photo_ids: list[int],
+        team: bool = False,
+        passphrase: Optional[str] = None,
+        additional: list[str] = None,
+        timeout: Optional[float] = None,
+    ) -> dict[int, dict[str, object]]:
+        """Get details of several photos. Return dict photo_id -> photo for photos found"""
+        futures = {photo_id: self.request(photo_id, team, passphrase, additional) for photo_id in photo_ids}
+        photos = {photo_id: future.result(timeout) for photo_id, future in futures.items()}
+        return {photo_id: photo for photo_id, photo in photos.items() if photo is not None}
+
+    def _flush(self) -> None:
+        """end of window : send pending requests"""
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            self._timer = None
+        for group, requests in pending.items():
+            ids = list(requests)
+            for offset in range(0, len(ids), self._chunk):
+                chunk = {photo_id: requests[photo_id] for photo_id in ids[offset : offset + self._chunk]}
+                self._executor.submit(self._resolve, group, chunk)
+
+    def _resolve(self, group: tuple, requests: dict[int, list[Future]]) -> None:
+        """one photos_from_ids call, resolve futures of requests"""
+        team, passphrase, additional = group
+        kwargs = {"passphrase": passphrase} if passphrase else {}
+        if additional:
+            kwargs["additional"] = list(additional)
+        try:
+            photos = {photo["id"]: photo for photo in self._photos.photos_from_ids(list(requests), team, **kwargs)}
+        except Exception as _e:
+            for futures in requests.values():
+                for future in futures:
+                    future.set_exception(_e)
+            return
+        for photo_id, futures in requests.items():
+            for future in futures:
+                future.set_result(photos.get(photo_id))
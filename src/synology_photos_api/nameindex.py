@@ -0,0 +1,84 @@
+"""
+Names indexes
+
+    - class NameIndex : case insensitive index by name of records (tags, albums, filters, ...), refreshed after TTL
+
+"""
+from __future__ import annotations
+from typing import Optional, Any, Callable, Iterable
+import threading
+import time
+
+# delay (seconds) before reload of an index
+NAME_INDEX_TTL = 300
+
+
+class NameIndex:
+    """Index of records by lowercased name, loaded on first access and reloaded when older than ttl
+
+    Loader returns records (list of dict with "id", "name", ...) or sections of records
+    (dict section -> list of records, as search filters)
+
+    ``` python
+        tags = NameIndex(lambda: photos.iter_general_tags(team=False))
+        tag = tags.get("Beach")
+    ```
+    """
+
+    def __init__(self, loader: Callable[[], Any], ttl: float = NAME_INDEX_TTL, key: str = "name") -> None:
+        self._loader = loader
+        self._ttl = ttl
+        self._key = key
+        self._lock = threading.Lock()
+        # section -> {lowercased name: record}, section None when loader returns records
+        self._sections: Optional[dict[Optional[str], dict[str, dict[str, object]]]] = None
+        self._records: list = []
+        self._raw_sections: dict[str, list] = {}
+        self._loaded = 0.0
+
+    def get(self, name: str, section: Optional[str] = None) -> dict[str, object] | None:
+        """record from name (case insensitive), None if not found"""
+        return self._index().get(section, {}).get(name.lower())
+
+    def records(self, section: Optional[str] = None) -> list:
+        """all records (of section)"""
+        self._index()
+        return self._records if section is None else self._raw_sections.get(section, [])
+
+    def update(self, data: Iterable[dict[str, object]] | dict[str, list]) -> None:
+        """set index from data freshly loaded"""
+        with self._lock:
+            self._build(data)
+
+    def invalidate(self) -> None:
+        """force reload on next access"""
+        with self._lock:
+            self._sections = None
+
+    def _index(self) -> dict[Optional[str], dict[str, dict[str, object]]]:
+        """internal get index, load it if needed"""
+        with self._lock:
+            if self._sections is None or time.monotonic() - self._loaded > self._ttl:
+                self._build(self._loader())
+            return self._sections
+
+    def _build(self, data: Iterable[dict[str, object]] | dict[str, list]) -> None:
+        """internal build index"""
+        if isinstance(data, dict):
+            self._raw_sections = data
+            self._records = []
+            sections = data.items()
+        else:
+            self._raw_sections = {}
+            self._records = list(data)
+            sections = [(None, self._records)]
+        self._sections = {
+            section: {
+                str(record[self._key]).lower(): record
+                for record in records
+                if isinstance(record, dict) and self._key in record
+            }
+            for section, records in sections
+            if isinstance(records, list)
+        }
+        self._loaded = time.monotonic()
@@ -8,17 +8,37 @@ Synology Photo access (via Synology APIs DSM 7)
 """
 from __future__ import annotations
 from pathlib import PurePosixPath
-from typing import Optional, Any
+from typing import Optional, Any, Callable, Iterator, MutableMapping
 import json
+import functools
+import itertools
+import contextlib
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import pytz
 from . import base_api
 from .exceptions import APIError, PhotosError
+from .hydration import Hydrator
+from .nameindex import NameIndex
 
 
 # error code when raising PhotosError from this file
 API_ERROR = 1212
 
+# maximum records by list request
+PAGE_SIZE_MAX = 5000
+# concurrent page requests in fetch_pages
+PAGE_WORKERS = 4
+
+# keys in metadata mapping are scoped by server and account : (prefix, base url, username, ...) (see _metadata_key)
+# key prefix in metadata mapping for photo space : ("space", ..., photo_id) -> (team, thumbnail cache_key)
+SPACE_KEY = "space"
+# key prefix in metadata mapping for folder path : ("folder", ..., team, path) -> folder id
+FOLDER_KEY = "folder"
+# key prefix in metadata mapping for sub-folders known : ("subfolders", ..., team, path) -> set of sub-folders paths
+# (forget_folders walks the sub-tree, no scan of all keys)
+SUBFOLDERS_KEY = "subfolders"
+
 
 class Photos(base_api.BaseApi):
     """Implements access to APIs Synology Photo (DSM 7)
@@ -37,6 +57,20 @@ class Photos(base_api.BaseApi):
 
     - The maximum for "limit" argument is 5000, greater value raise PhotosError
 
+    - `fetch_pages` gets all records of a list method with concurrent page requests
+
+    - `hydrator` batches photos details requests by identifier (see `Hydrator`)
+
+    - tags, albums and search filters are found by name with indexes reloaded after a delay (see `refresh_names`)
+
+    - space and thumbnail cache_key of photos seen in listings are kept in `metadata` mapping
+      (a dict by default, can be a persistent mapping as a diskcache.Cache), see `locate_photo`
+
+    - folders ids of paths seen in listings are kept in `metadata` mapping, see `lookup_folder`, `forget_folders`
+
+    - list methods have an iterator variant (`iter_photos_in_folder`, `iter_list_albums`, ...)
+      streaming all records page by page, with next page requested in background (see `iter_pages`)
+
     ## Methods available
     ### General methods
     * get_userinfo
@@ -45,15 +79,20 @@ class Photos(base_api.BaseApi):
 
     #### methods on folders
     * list_folders
+    * iter_list_folders
     * count_folders
     * lookup_folder
+    * lookup_folders
+    * forget_folders
     * get_folder
     * photos_in_folder
+    * iter_photos_in_folder
     * count_photos_in_folder
     * share_team_folder
 
     #### methods on albums
     * list_albums
+    * iter_list_albums
     * get_albums
     * count_albums
     * count_photos_in_album
@@ -66,12 +105,14 @@ class Photos(base_api.BaseApi):
     * set_album_condition
     * share_album
     * photos_in_album
+    * iter_photos_in_album
 
     * list_shareable_users_and_groups
 
     #### methods on filters
     * count_photos_with_filter
     * photos_with_filter
+    * iter_photos_with_filter
     * list_search_filters
 
     #### methods on photos
@@ -82,13 +123,16 @@ class Photos(base_api.BaseApi):
     #### methods on keywords (search in geolocalisation address, filename, description, identifier, ...?)
     * count_photos_with_keyword
     * photos_with_keyword
+    * iter_photos_with_keyword
 
     #### methods on tags (search in geolocalisation address, filename, description, identifier, ...?)
     * count_general_tags
     * general_tags
+    * iter_general_tags
     * general_tag
     * count_photos_with_tag
     * photos_with_tag
+    * iter_photos_with_tag
 
     #### methods on timeline
     * get_timeline
@@ -316,10 +360,27 @@ class Photos(base_api.BaseApi):
         dsm_version: int = 7,
         debug: bool = True,
         otp_code: Optional[str] = None,
+        metadata: Optional[MutableMapping] = None,
+        reuse_session: bool = False,
     ) -> None:
-        """Constructor : Login in Synology Photo"""
+        """Constructor : Login in Synology Photo
+
+        API catalogue is kept in `metadata` mapping. If reuse_session, session id is kept there too
+        (at most auth.SESSION_TTL), and reused by next login while valid : anyone able to read `metadata`
+        storage gets a valid NAS session, keep it private
+        """
         super(Photos, self).__init__(
-            ip_address, port, username, password, secure, cert_verify, dsm_version, debug, otp_code
+            ip_address,
+            port,
+            username,
+            password,
+            secure,
+            cert_verify,
+            dsm_version,
+            debug,
+            otp_code,
+            api_cache=metadata,
+            reuse_session=reuse_session,
         )
 
         self.session.get_api_list("Foto")
@@ -329,8 +390,15 @@ class Photos(base_api.BaseApi):
         self.base_url: str = self.session.base_url
 
         self._userinfo: Any = None
-        self._tags = {False: None, True: None}
-        self.avail_filters = {False: None, True: None}
+        # batched photos_from_ids
+        self.hydrator = Hydrator(self)
+        # names indexes, by space for tags and filters
+        self.tags_index = {team: NameIndex(functools.partial(self.iter_general_tags, team)) for team in [False, True]}
+        self.filters_index = {team: NameIndex(functools.partial(self._search_filters, team)) for team in [False, True]}
+        self.albums_index = NameIndex(self.iter_list_albums)
+        # metadata from listings (photos space, ...), keys scoped by server and account
+        self.metadata: MutableMapping = {} if metadata is None else metadata
+        self._metadata_scope = (self.base_url, username)
 
     def logout(self) -> None:
         """Logout from Synology Photo API"""
@@ -395,6 +463,88 @@ class Photos(base_api.BaseApi):
         self._userinfo = self._request_data("SYNO.Foto.UserInfo", req_param)
         return self._userinfo
 
+    def fetch_pages(
+        self,
+        list_method: Callable[..., list[dict[str, object]]],
+        *args,
+        total: int,
+        page_size: int = PAGE_SIZE_MAX,
+        workers: int = PAGE_WORKERS,
+        on_prefix: Optional[Callable[[int, list[dict[str, object]]], None]] = None,
+        **kwargs,
+    ) -> list[dict[str, object]]:
+        """Fetch records of a list method with concurrent page requests
+        ### Parameters
+            * list_method : list method with offset/limit (photos_in_folder, photos_with_tag, ...)
+            * args, kwargs : list method parameters
+            * total : records count (from the corresponding count method)
+            * page_size : records by request (maximum 5000)
+            * workers : maximum concurrent requests
+            * on_prefix : optional callable(offset, records) called in caller thread for each page,
+              in order, as soon as all previous pages are received
+        ### Return
+            records list
+        """
+        offsets = range(0, total, page_size)
+        records = []
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(offsets))), thread_name_prefix="page") as executor:
+            futures = [
+                executor.submit(list_method, *args, offset=offset, limit=min(page_size, total - offset), **kwargs)
+                for offset in offsets
+            ]
+            try:
+                for offset, future in zip(offsets, futures):
+                    page = future.result()
+                    if on_prefix is not None:
+                        on_prefix(offset, page)
+                    records.extend(page)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        return records
+
+    def iter_pages(
+        self,
+        list_method: Callable[..., list[dict[str, object]]],
+        *args,
+        page_size: int = PAGE_SIZE_MAX,
+        prefetch: bool = True,
+        **kwargs,
+    ) -> Iterator[dict[str, object]]:
+        """Iterate on all records of a list method, page by page
+        ### Parameters
+            * list_method : list method with offset/limit (photos_in_folder, photos_with_tag, ...)
+            * args, kwargs : list method parameters (`offset` for the first record, `limit` for records maximum)
+            * page_size : records by request (maximum 5000)
+            * prefetch : next page requested in background while current page is consumed
+        ### Return
+            records iterator
+        """
+        limit = kwargs.pop("limit", None)
+        if limit is not None:
+            page_size = max(1, min(page_size, limit))
+            records = self.iter_pages(list_method, *args, page_size=page_size, prefetch=prefetch, **kwargs)
+            yield from itertools.islice(records, limit)
+            return
+        offset = kwargs.pop("offset", 0)
+        request = functools.partial(list_method, *args, limit=page_size, **kwargs)
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch") if prefetch else None
+        try:
+            page = request(offset=offset)
+            while True:
+                offset += len(page)
+                next_page = None
+                if executor and len(page) == page_size:
+                    next_page = executor.submit(request, offset=offset)
+                yield from page
+                if len(page) < page_size:
+                    return
+                page = next_page.result() if next_page else request(offset=offset)
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
     def _count(self, api_name: str, **kwargs) -> int:
         """internal generic count"""
         req_param = dict({"method": "count"}, **kwargs)
@@ -413,7 +563,53 @@ class Photos(base_api.BaseApi):
             req_param["sort_by"] = "filename"
         if "sort_direction" not in req_param:
             req_param["sort_direction"] = "desc"
-        return self._request_data(api_name, req_param, method=http_method)
+        response = self._request_data(api_name, req_param, method=http_method)
+        # photos listed in a known space (not album)
+        if api_name.endswith((".Browse.Item", ".Search.Search")) and not (
+            "album_id" in req_param or "passphrase" in req_param
+        ):
+            self._remember_spaces(response["data"]["list"], api_name.startswith("SYNO.FotoTeam"))
+        return response
+
+    def _metadata_key(self, prefix: str, *parts) -> tuple:
+        """internal key in metadata mapping, scoped by server and account (another NAS may reuse ids)"""
+        return (prefix, *self._metadata_scope, *parts)
+
+    def _remember_spaces(self, photos: list[dict[str, object]], team: bool) -> None:
+        """internal keep photos space and thumbnail cache_key in metadata (only changes are written)"""
+        changes = {}
+        for photo in photos:
+            cache_key = photo.get("additional", {}).get("thumbnail", {}).get("cache_key")
+            key = self._metadata_key(SPACE_KEY, photo["id"])
+            known = self.metadata.get(key)
+            if known is None or (cache_key is not None and tuple(known) != (team, cache_key)):
+                changes[key] = (team, cache_key)
+        if not changes:
+            return
+        # one transaction for all writes when persistent
+        transact = getattr(self.metadata, "transact", contextlib.nullcontext)
+        with transact():
+            for key, value in changes.items():
+                self.metadata[key] = value
+
+    def locate_photo(self, photo_id: int, need_cache_key: bool = False) -> tuple[bool, str | None] | None:
+        """Locate photo : space, and thumbnail cache_key
+        ### Parameters
+            photo_id : photo identifier
+            need_cache_key : probe spaces if cache_key unknown
+        ### Return
+            (team, cache_key) from photos already listed, or by probing personal then shared space.
+            None if not found
+        """
+        located = self.metadata.get(self._metadata_key(SPACE_KEY, photo_id))
+        if located is not None and (located[1] is not None or not need_cache_key):
+            return located
+        for team in [located[0]] if located is not None else [False, True]:
+            # photos_from_ids results are kept in metadata
+            photo = self.hydrator.get(photo_id, team, additional=["thumbnail"])
+            if photo:
+                return team, photo["additional"]["thumbnail"]["cache_key"]
+        return None
 
     #
     # methods on folder
@@ -432,7 +628,9 @@ class Photos(base_api.BaseApi):
         """
         api_name = "SYNO.FotoTeam.Browse.Folder" if team else "SYNO.Foto.Browse.Folder"
         req_param = dict({"method": "get", "id": folder_id}, **kwargs)
-        return self._request_data(api_name, req_param)["data"]["folder"]
+        folder = self._request_data(api_name, req_param)["data"]["folder"]
+        self._remember_folders([folder], team)
+        return folder
 
     def list_folders(self, folder_id: int, team: bool = False, **kwargs) -> list[dict[str, object]]:
         """List sub-folders in folder
@@ -446,7 +644,51 @@ class Photos(base_api.BaseApi):
         """
         api_name = "SYNO.FotoTeam.Browse.Folder" if team else "SYNO.Foto.Browse.Folder"
         req_param = dict({"id": folder_id}, **kwargs)
-        return self._method_list(api_name, http_method="post", **req_param)["data"]["list"]
+        folders = self._method_list(api_name, http_method="post", **req_param)["data"]["list"]
+        self._remember_folders(folders, team)
+        return folders
+
+    def _remember_folders(self, folders: list[dict[str, object]], team: bool) -> None:
+        """internal keep folders ids by path in metadata, and paths by parent (only changes are written)"""
+        changes = {}
+        subfolders: dict[str, set[str]] = {}
+        for folder in folders:
+            key = self._metadata_key(FOLDER_KEY, bool(team), folder["name"])
+            if self.metadata.get(key) != folder["id"]:
+                changes[key] = folder["id"]
+            parent = str(PurePosixPath(folder["name"]).parent)
+            if parent != folder["name"]:
+                subfolders.setdefault(parent, set()).add(folder["name"])
+        for parent, paths in subfolders.items():
+            key = self._metadata_key(SUBFOLDERS_KEY, bool(team), parent)
+            known = self.metadata.get(key, set())
+            if not paths <= known:
+                changes[key] = known | paths
+        if not changes:
+            return
+        transact = getattr(self.metadata, "transact", contextlib.nullcontext)
+        with transact():
+            for key, value in changes.items():
+                self.metadata[key] = value
+
+    def forget_folders(self, path: str = "/", team: bool | None = None) -> None:
+        """Invalidate folders ids kept for path and its sub-folders
+        ### Parameter
+            path : folder path ("/" for all)
+            team : personal or shared space, None for both
+        """
+        transact = getattr(self.metadata, "transact", contextlib.nullcontext)
+        with transact():
+            for space in [False, True] if team is None else [bool(team)]:
+                paths = ["/" + path.strip("/")]
+                while paths:
+                    current = paths.pop()
+                    self.metadata.pop(self._metadata_key(FOLDER_KEY, space, current), None)
+                    paths.extend(self.metadata.pop(self._metadata_key(SUBFOLDERS_KEY, space, current), None) or [])
+
+    def iter_list_folders(self, folder_id: int, team: bool = False, **kwargs) -> Iterator[dict[str, object]]:
+        """Iterate on all sub-folders (see `list_folders`, and `iter_pages` for page_size, prefetch)"""
+        return self.iter_pages(self.list_folders, folder_id, team, **kwargs)
 
     def count_folders(self, folder_id: int = 0, team: bool = False) -> int:
         """Count sub-folders in folder
@@ -469,6 +711,8 @@ class Photos(base_api.BaseApi):
             offset, limit, sort_by, sort_direction, additional, ...
         ### Return
           folder dict or None
+
+        The lookup starts from the deepest folder of path with id already known (see `forget_folders`)
         """
         if root_folder == 0 and path == "/":
             return self.get_folder(root_folder, team=team, **kwargs)
@@ -477,29 +721,67 @@ class Photos(base_api.BaseApi):
                 path = path[1:]
             folder = self.get_folder(root_folder, team=team)
             path = str(PurePosixPath(folder["name"]).joinpath(path))
-        parent = 0
-        found_path = ""
-        folder = ""
-        for part in path.strip("/").split("/"):
-            count = self.count_folders(parent, team)
-            for offset in range(0, count, 1000):
-                kwargs["offset"] = offset
-                folders_response = self.list_folders(parent, team, **kwargs)
-                folder = next(
-                    filter(
-                        lambda elem: elem["name"] == f"{found_path}/{part}",
-                        folders_response,
-                    ),
-                    None,
-                )
-                if folder:
-                    parent = folder["id"]
-                    found_path = folder["name"]
-                    break
+        path = "/" + path.strip("/")
+        parts = path.strip("/").split("/")
+        # deepest folder with id known
+        for depth in range(len(parts), 0, -1):
+            known = self.metadata.get(self._metadata_key(FOLDER_KEY, bool(team), "/" + "/".join(parts[:depth])))
+            if known is not None:
+                break
+        else:
+            return self._lookup_folder(parts, 0, 0, team, **kwargs)
+        ancestor = "/" + "/".join(parts[:depth])
+        try:
+            if depth == len(parts):
+                folder = self.get_folder(known, team=team, **kwargs)
             else:
-                return
+                folder = self._lookup_folder(parts, depth, known, team, **kwargs)
+                if folder is None and self.get_folder(known, team=team)["name"] == ancestor:
+                    # really not found
+                    return None
+        except PhotosError:
+            # folder id kept is no more valid
+            folder = None
+        if folder is None or folder["name"] != path:
+            # may be moved or renamed : lookup again without ids kept
+            self.forget_folders(ancestor, team)
+            folder = self._lookup_folder(parts, 0, 0, team, **kwargs)
         return folder
 
+    def _lookup_folder(
+        self, parts: list[str], depth: int, parent: int, team: bool, **kwargs
+    ) -> dict[str, object] | None:
+        """internal lookup for folder path parts, from folder of parts[:depth] with id parent"""
+        found_path = "/" + "/".join(parts[:depth]) if depth else ""
+        folder = None
+        for part in parts[depth:]:
+            # stop listing sub-folders as soon as found
+            folder = next(
+                filter(
+                    lambda elem: elem["name"] == f"{found_path}/{part}",
+                    self.iter_list_folders(parent, team, **kwargs),
+                ),
+                None,
+            )
+            if not folder:
+                return None
+            parent = folder["id"]
+            found_path = folder["name"]
+        return folder
+
+    def lookup_folders(self, paths: list[str], team: bool = False, **kwargs) -> dict[str, dict[str, object] | None]:
+        """Lookup for several folders
+        ### Parameter
+            paths : absolute paths to lookup
+            team : personal or shared space
+        ### kwargs parameters
+            additional, ...
+        ### Return
+          dict path -> folder dict or None
+        """
+        # sorted : ancestors first, listings of common parents feed the lookup of next paths
+        return {path: self.lookup_folder(path, team=team, **kwargs) for path in sorted(set(paths))}
+
     def count_photos_in_folder(self, folder_id: int, team: bool = False) -> int:
         """Count items in folder
         ### Parameters
@@ -525,6 +807,10 @@ class Photos(base_api.BaseApi):
         req_param = dict({"folder_id": folder_id}, **kwargs)
         return self._method_list(api_name, http_method="post", **req_param)["data"]["list"]
 
+    def iter_photos_in_folder(self, folder_id: int, team: bool = False, **kwargs) -> Iterator[dict[str, object]]:
+        """Iterate on all photos in folder (see `photos_in_folder`, and `iter_pages` for page_size, prefetch)"""
+        return self.iter_pages(self.photos_in_folder, folder_id, team, **kwargs)
+
     #
     # methods on albums
     #
@@ -542,11 +828,8 @@ class Photos(base_api.BaseApi):
           albums list or None
         """
         if isinstance(album_ids, str):
-            count = self.count_albums()
-            for album in self.list_albums(limit=count):
-                if album["name"].lower() == album_ids.lower():
-                    return [album]
-            return None
+            album = self.albums_index.get(album_ids)
+            return [album] if album else None
 
         req_param = dict(
             {
@@ -577,6 +860,10 @@ class Photos(base_api.BaseApi):
             kwargs["sort_by"] = "album_name"
         return self._method_list("SYNO.Foto.Browse.Album", http_method="post", **kwargs)["data"]["list"]
 
+    def iter_list_albums(self, **kwargs) -> Iterator[dict[str, object]]:
+        """Iterate on all albums (see `list_albums`, and `iter_pages` for page_size, prefetch)"""
+        return self.iter_pages(self.list_albums, **kwargs)
+
     def count_albums(self, **kwargs) -> int:
         """Count albums
         ### kwargs parameters
@@ -798,6 +1085,10 @@ class Photos(base_api.BaseApi):
             req_param["method"] = "get"
         return self._method_list("SYNO.Foto.Browse.Item", http_method="post", **req_param)["data"]["list"]
 
+    def iter_photos_in_album(self, album: int = 0, **kwargs) -> Iterator[dict[str, object]]:
+        """Iterate on all photos in album (see `photos_in_album`, and `iter_pages` for page_size, prefetch)"""
+        return self.iter_pages(self.photos_in_album, album, **kwargs)
+
     #
     # methods on filters
     #
@@ -844,6 +1135,12 @@ class Photos(base_api.BaseApi):
         )
         return self._method_list(api_name, http_method="post", **req_param)["data"]["list"]
 
+    def iter_photos_with_filter(
+        self, folder_id: int, filters: dict[str, object], team: bool = False, **kwargs
+    ) -> Iterator[dict[str, object]]:
+        """Iterate on all items with filter (see `photos_with_filter`, and `iter_pages` for page_size, prefetch)"""
+        return self.iter_pages(self.photos_with_filter, folder_id, filters, team, **kwargs)
+
     def list_search_filters(
         self,
         settings: dict[str, object] = None,
@@ -902,7 +1199,11 @@ class Photos(base_api.BaseApi):
             },
             **kwargs,
         )
-        return self._request_data(api_name, req_param)["data"]["list"]
+        # POST : ids list (up to Hydrator chunk) does not fit in an url
+        photos = self._request_data(api_name, req_param, method="post")["data"]["list"]
+        if "passphrase" not in kwargs:
+            self._remember_spaces(photos, team)
+        return photos
 
     def photo_download(self, photo_id: int, team: bool | None = None, passphrase: str = None) -> bytes:
         """Download Photo
@@ -916,7 +1217,8 @@ class Photos(base_api.BaseApi):
         """
         # determine if photo is in personal or shared space
         if not passphrase and team is None:
-            team = len(self.photos_from_ids(photo_id, True)) > 0
+            located = self.locate_photo(photo_id)
+            team = located is not None and located[0]
         api_name = "SYNO.FotoTeam.Download" if team else "SYNO.Foto.Download"
         if isinstance(photo_id, int):
             photo_id = [photo_id]
@@ -945,17 +1247,15 @@ class Photos(base_api.BaseApi):
             * team : None, False for personal space, or True for shared space
             * passphrase : None or album passphrase when album is "shared with me"
 
-        When cache_key or team is None, a call to 'photos_from_ids' is done for determine space and get thumbnail structure.
+        When cache_key or team is None, space and cache_key come from photos already listed (see `locate_photo`),
+        or a call to 'photos_from_ids' is done for determine space and get thumbnail structure.
         ### Return
             Raw image data
         """
         if (not passphrase and team is None) or cache_key is None:
-            cache_key = None
-            for team in [False, True]:
-                photos = self.photos_from_ids(photo_id, team, additional=["thumbnail"])
-                if photos:
-                    cache_key = photos[0]["additional"]["thumbnail"]["cache_key"]
-                    break
+            located = self.locate_photo(photo_id, need_cache_key=cache_key is None)
+            if located is not None:
+                team, cache_key = located[0], cache_key or located[1]
             if not cache_key:
                 raise PhotosError(APIError(API_ERROR, f"thumbnail {photo_id} not found"))
         api_name = "SYNO.FotoTeam.Thumbnail" if team else "SYNO.Foto.Thumbnail"
@@ -1006,15 +1306,18 @@ class Photos(base_api.BaseApi):
         req_param = dict({"method": "list_item", "keyword": keyword}, **kwargs)
         return self._method_list(api_name, **req_param)["data"]["list"]
 
+    def iter_photos_with_keyword(self, keyword: str, team: bool = False, **kwargs) -> Iterator[dict[str, object]]:
+        """Iterate on all photos with keyword (see `photos_with_keyword`, and `iter_pages` for page_size, prefetch)"""
+        return self.iter_pages(self.photos_with_keyword, keyword, team, **kwargs)
+
     #
     # methods on tags (=identifiers)
     #
 
-    def _load_tags(self, team: bool = False, force: bool = False):
-        """internal load tags"""
-        if force or not self._tags[team]:
-            self._tags[team] = self.general_tags(team)
-        return self._tags[team]
+    def refresh_names(self) -> None:
+        """force reload of tags, albums and filters names indexes on next access"""
+        for index in [*self.tags_index.values(), *self.filters_index.values(), self.albums_index]:
+            index.invalidate()
 
     def count_general_tags(self, team: bool = False) -> int:
         """Count all tags (identifiers)
@@ -1030,6 +1333,8 @@ class Photos(base_api.BaseApi):
         """Get all tags (identifiers)
         ### Parameters
             * team : space to use: personal (`False`) or shared (`True`) space
+        ### kwargs parameters
+            offset, limit : one page of tags. All tags when not set
         ### Return
             * tags list
         ### Typical return
@@ -1050,8 +1355,15 @@ class Photos(base_api.BaseApi):
         ```
         """
         api_name = "SYNO.FotoTeam.Browse.GeneralTag" if team else "SYNO.Foto.Browse.GeneralTag"
-        self._tags[team] = self._method_list(api_name, **kwargs)["data"]["list"]
-        return self._tags[team]
+        if "offset" in kwargs or "limit" in kwargs:
+            return self._method_list(api_name, **kwargs)["data"]["list"]
+        tags = list(self.iter_general_tags(team, **kwargs))
+        self.tags_index[team].update(tags)
+        return tags
+
+    def iter_general_tags(self, team: bool = False, **kwargs) -> Iterator[dict[str, object]]:
+        """Iterate on all tags (see `general_tags`, and `iter_pages` for page_size, prefetch)"""
+        return self.iter_pages(self.general_tags, team, **kwargs)
 
     def general_tag(self, tag: int | list[int] | str, team: bool = False, **kwargs) -> list[dict[str, object]] | None:
         """Get specific tag
@@ -1077,11 +1389,8 @@ class Photos(base_api.BaseApi):
             tag = [tag]
 
         if isinstance(tag, str):
-            tags = self._load_tags(team)
-            for tag_obj in tags:
-                if tag_obj["name"].lower() == tag.lower():
-                    return [tag_obj]
-            return None
+            tag_obj = self.tags_index[team].get(tag)
+            return [tag_obj] if tag_obj else None
 
         req_param = dict({"method": "get", "id": tag}, **kwargs)
         return self._request_data(api_name, req_param=req_param, method="post")["data"]["list"]
@@ -1095,11 +1404,8 @@ class Photos(base_api.BaseApi):
             * photos count
 
         """
-        tags = self._load_tags(team)
-        for tag_obj in tags:
-            if tag_obj["name"].lower() == tag.lower():
-                return tag_obj["item_count"]
-        return 0
+        tag_obj = self.tags_index[team].get(tag)
+        return tag_obj["item_count"] if tag_obj else 0
 
     def photos_with_tag(self, tag_name: str, team: bool = False, **kwargs) -> list[dict[str, object]]:
         """get photos list with specific tag
@@ -1122,6 +1428,10 @@ class Photos(base_api.BaseApi):
         req_param = dict({"general_tag_id": tags[0]["id"]}, **kwargs)
         return self._method_list(api_name, http_method="post", **req_param)["data"]["list"]
 
+    def iter_photos_with_tag(self, tag_name: str, team: bool = False, **kwargs) -> Iterator[dict[str, object]]:
+        """Iterate on all photos with tag (see `photos_with_tag`, and `iter_pages` for page_size, prefetch)"""
+        return self.iter_pages(self.photos_with_tag, tag_name, team, **kwargs)
+
     def get_admin_settings(self) -> dict[str, object] | str:
         """### Get admin settings
         Typical return:
@@ -1154,10 +1464,8 @@ class Photos(base_api.BaseApi):
         """
         return self._request_data("SYNO.Foto.Setting.Guest", {"method": "get"})
 
-    def _load_avail_filters(self, team: bool) -> None:
+    def _search_filters(self, team: bool) -> dict[str, list]:
         """internal load avail filters for space"""
-        if self.avail_filters[team] is not None:
-            return
         filter_settings = {
             "focal_length_group": True,
             "general_tag": True,
@@ -1173,7 +1481,7 @@ class Photos(base_api.BaseApi):
             "rating": True,
             "lens": True,
         }
-        self.avail_filters[team] = self.list_search_filters(filter_settings, team=team)
+        return self.list_search_filters(filter_settings, team=team)
 
     def build_filters(self, filters, team=False):
         """Rebuild a filter dictionnary expressed with item names
@@ -1218,12 +1526,9 @@ class Photos(base_api.BaseApi):
         def get_code(key: str, value: str, team: bool) -> int | None:
             if isinstance(value, int):
                 return value
-            self._load_avail_filters(team)
-            section = self.avail_filters[team][key]
-            for dict_idname in section:
-                vname = dict_idname["name"]
-                if vname.lower() == value.lower():
-                    return dict_idname["id"]
+            dict_idname = self.filters_index[team].get(value, section=key)
+            if dict_idname:
+                return dict_idname["id"]
             raise PhotosError(API_ERROR, f'Incorrect value for filter["{key}"] : {value}')
 
         filters = dict(filters)
@@ -8,11 +8,16 @@ Based on https://github.com/adesfontaines/pyqtexplorer
 import sys
 import logging
 import os
+import threading
 import ctypes
 import weakref
 import winreg
 from pathlib import PurePosixPath
-from threading import Event
+
+from utils import StartupProfile
+
+# startup timings, printed with --profile-startup
+startup = StartupProfile("--profile-startup" in sys.argv)
 
 from PyQt6.QtWidgets import (
     QApplication,
@@ -31,6 +36,7 @@ from PyQt6.QtWidgets import (
     QFrame,
     QFileDialog,
     QComboBox,
+    QLabel,
 )
 from PyQt6.QtGui import (
     QIcon,
@@ -38,7 +44,6 @@ from PyQt6.QtGui import (
     QAction,
     QImage,
     QPixmap,
-    QColorSpace,
 )
 from PyQt6.QtCore import (
     Qt,
@@ -48,15 +53,16 @@ from PyQt6.QtCore import (
     QItemSelectionRange,
     QSettings,
     QTimer,
+    pyqtSignal,
 )
 
-from diskcache.core import args_to_key as get_cache_key
-from cache import thumbcache, download_thread_pool, THUMB_CALLABLE_NAME, control_thread_pool
+startup.mark("import Qt")
 
-from qt_json_view.model import JsonModel
-from qt_json_view.view import JsonView
+from diskcache.core import args_to_key as get_cache_key
+from cache import thumbcache, download_thread_pool, THUMB_CALLABLE_NAME, download_generations, download_limiter
 
 from synophotosmodel import (
+    signal as modelSignal,
     SynoModel,
     SynoNode,
     NodeType,
@@ -72,14 +78,18 @@ from internalconfig import (
     USE_COMBO_VIEW,
     INITIAL_PATH,
     APP_NAME,
-    CACHE_PIXMAP,
     VERSION,
     TAB_MAIN_EXPLORER,
     TAB_PERSONAL_TAGS,
     TAB_SHARED_TAGS,
 )
+
+startup.mark("import model, api, caches")
+
 from pyqt_slideshow.slideshow import SlideShow
 from cacheddownload import download_thumbnail
+from imagedecode import decode_pool
+from cacheverify import verify_cache
 from loggerwidget import LoggerWidget
 from synotabwidget import SynoTabWidget
 from photosview import PhotosIconView, PhotosDetailsView
@@ -87,6 +97,8 @@ from synotreeview import SynoTreeView
 from imagewidget import ImageWidget
 from uidialogs import LoginDialog, AboutDialog, FailedConnectDialog
 
+startup.mark("import widgets")
+
 
 # search combo value
 WHERE_TAG_PERSONAL = "Tag Personal"
@@ -168,27 +180,29 @@ def fatalConnect():
 class App(QMainWindow):
     """main application"""
 
+    # emitted by login thread, with connected status
+    loginFinished = pyqtSignal(bool)
+
     def __init__(self, parent=None):
         super(App, self).__init__(parent=parent)
 
         # Navigation history
         self.history = History(100)
 
-        # thumbnails management
-        self.eventCancelThumb = Event()
-        self.futureDownloadChilds = None
-
         # mainExplorer creation deferred in ChangeView
         self.mainExplorer = None
 
         # settings access
         self.settings = QSettings("fdenivac", "SynoPhotosExplorer")
 
-        # Synology Photos login (status check after init UI ...)
-        self.synoPhotosLogin()
+        # Synology Photos login deferred after window shown, views use fake API meanwhile
+        self.loginThread = None
+        self.loginPath = self.settings.value("initialpath", INITIAL_PATH)
+        self.loginFinished.connect(self.onLoginFinished)
 
         # App init
         self.initUI()
+        startup.mark("init UI")
 
         # restore window position
         self.restoreGeometry(self.settings.value("mainwinpos", bytes("", "utf-8")))
@@ -216,12 +230,25 @@ class App(QMainWindow):
             self.actionLogView.setChecked(not self.log_dock.isHidden())
 
         self.statusBar().showMessage(f"Welcome to {APP_NAME} version {VERSION}")
+        # adaptive download limit
+        self.downloadLimitLabel = QLabel()
+        self.statusBar().addPermanentWidget(self.downloadLimitLabel)
+        self.downloadLimitTimer = QTimer(self)
+        self.downloadLimitTimer.timeout.connect(self.updateDownloadLimit)
+        self.downloadLimitTimer.start(1000)
+        self.updateDownloadLimit()
         self.updateToolbar()
+        startup.mark("restore state")
         self.show()
+        startup.mark("show")
+
+        QTimer.singleShot(0, self.onShown)
 
-        # display fatal error if Synology API failed to connect
-        if not synofoto.is_connected():
-            QTimer.singleShot(1, fatalConnect)
+    def onShown(self):
+        """first event loop iteration : start login"""
+        startup.mark("event loop started")
+        startup.report()
+        self.synoPhotosLogin()
 
     def synoPhotosLogin(
         self,
@@ -235,8 +262,15 @@ class App(QMainWindow):
         otpcode=None,
     ):
         """
-        Synology Photos Login
+        Synology Photos Login in thread, loginFinished emitted when done
         """
+        if self.isLoginPending():
+            self.statusBar().showMessage("Synology Photos login already in progress")
+            return
+        from dotenv import load_dotenv
+
+        # take environment variables (addr, port ,user, password, ...) from .env file
+        load_dotenv()
         address = os.environ.get("SYNO_ADDR") if address is None else address
         port = os.environ.get("SYNO_PORT") if port is None else port
         username = os.environ.get("SYNO_USER") if username is None else username
@@ -244,9 +278,29 @@ class App(QMainWindow):
         secure = os.environ.get("SYNO_SECURE") if secure is None else secure
         certverif = os.environ.get("SYNO_CERTVERIF") if certverif is None else certverif
         otpcode = os.environ.get("SYNO_OPTCODE") if otpcode is None else otpcode
-        synofoto.login(address, port, username, password, secure, certverif, 7, debug, otpcode)
-        log.info(f"connected = {synofoto.is_connected()} to Synology Photos ({os.environ.get('SYNO_ADDR')})")
-        return synofoto.is_connected()
+        reuse = self.settings.value("reusesession", "false") == "true"
+
+        def login():
+            synofoto.login(address, port, username, password, secure, certverif, 7, debug, otpcode, reuse)
+            log.info(f"connected = {synofoto.is_connected()} to Synology Photos ({address})")
+            self.loginFinished.emit(synofoto.is_connected())
+
+        self.statusBar().showMessage(f"Connecting to Synology Photos ({address}) ...")
+        self.loginThread = threading.Thread(target=login, name="login", daemon=True)
+        self.loginThread.start()
+
+    def isLoginPending(self):
+        """return True if login thread is running"""
+        return self.loginThread is not None and self.loginThread.is_alive()
+
+    def onLoginFinished(self, connected):
+        """login done : new models using new synofoto"""
+        self.statusBar().showMessage(f"{'Connected' if connected else 'Not connected'} to Synology Photos")
+        if not connected:
+            fatalConnect()
+        self.resetModels(self.loginPath)
+        startup.mark("login")
+        startup.report("login")
 
     def initUI(self):
         """init User Interface"""
@@ -288,6 +342,9 @@ class App(QMainWindow):
         self.createSlideshowWidget(False)
         self.slideshow.setInterval(self.settings.value("slideshowdelay", 5000))
         self.modeFullscreen = False
+        # look-ahead : number of next photos loaded in background, direction of last move
+        self.slideshowPrefetch = int(self.settings.value("slideshowprefetch", 3))
+        self.slideDirection = 1
 
         # Main explorer
         self.changeView(self.currentExplorerView)
@@ -330,8 +387,13 @@ class App(QMainWindow):
         self.json_dock = QDockWidget("JSON Details")
         self.json_dock.setObjectName("json_dock")
         self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.json_dock)
-        self.json_view = JsonView()
-        self.json_dock.setWidget(self.json_view)
+        # json view created when dock first shown (see setJsonData)
+        self.json_view = None
+        self.jsonData = {}
+        # node shown in json dock, its missing fields loaded in thread
+        self.jsonNode = None
+        self.json_dock.visibilityChanged.connect(self.onJsonDockVisibilityChanged)
+        modelSignal.additionalLoaded.connect(self.onAdditionalLoaded)
 
         # Dock image widget
         self.thumbnail_dock = QDockWidget("Photo Thumbnail")
@@ -339,6 +401,8 @@ class App(QMainWindow):
         self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.thumbnail_dock)
         self.thumbnailWidget = ImageWidget(self)
         self.thumbnail_dock.setWidget(self.thumbnailWidget)
+        self.thumbnailKey = None
+        decode_pool.signal.decoded.connect(self.onImageDecoded)
         self.thumbnailWidget.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
         # logging windows
@@ -352,7 +416,19 @@ class App(QMainWindow):
             self.log_view = self.logTextBox
             self.log_dock.setWidget(self.logTextBox)
 
-        # restore pinned search
+        self.restorePinnedSearch()
+
+        # root path until login done (see onLoginFinished)
+        self.currentDir = ""
+        self.sideExplorer.model().setRootPath("/")
+        self.navigate(self.mainExplorer.model().setRootPath("/"))
+
+        self.updateToolbar()
+
+        log.info("END InitUI")
+
+    def restorePinnedSearch(self):
+        """create pinned searches in models"""
         self.settings.beginGroup("pinnedSearch")
         keys = self.settings.childKeys()
         for key in keys:
@@ -363,17 +439,40 @@ class App(QMainWindow):
             self.sideExplorer.model().createSearch(section, searchText, shared)
         self.settings.endGroup()
 
-        # set initial path and navigate
+    def resetModels(self, path):
+        """set new models using current synofoto, new main explorer, reset widgets and navigate to path"""
+        oldModels = [self.mainModel, self.sideExplorer.model()]
+        self.mainModel = SynoModel(
+            dirs_only=False,
+            additional=["thumbnail", "exif", "resolution"],
+            search=True,
+        )
+        self.sideExplorer.setModel(SynoModel(dirs_only=True, search=True))
+        self.sideExplorer.selectionModel().currentRowChanged.connect(self.onCurrentRowChangedInSideExpl)
+
+        # new view on new model (changeView creates it), keeping visibility
+        oldExplorer = self.mainExplorer
+        self.mainExplorer = None
         self.currentDir = ""
-        currentDir = self.settings.value("initialpath", INITIAL_PATH)
-        self.sideExplorer.model().setRootPath(currentDir)
-        self.sideExplorer.expandAbsolutePath(currentDir)
-        self.navigate(self.mainExplorer.model().setRootPath(currentDir))
-        self.setMainExplorerIndex("first")
+        self.changeView(self.currentExplorerView)
+        self.mainExplorer.setHidden(oldExplorer.isHidden())
+        oldExplorer.deleteLater()
+        for model in oldModels:
+            model.release()
+            model.deleteLater()
 
-        self.updateToolbar()
+        self.restorePinnedSearch()
 
-        log.info("END InitUI")
+        # reset widgets
+        self.jsonNode = None
+        self.setJsonData({})
+        self.thumbnailWidget.setImage(QPixmap())
+
+        self.sideExplorer.model().setRootPath(path)
+        self.sideExplorer.expandAbsolutePath(path)
+        self.navigate(self.mainModel.setRootPath(path))
+        self.setMainExplorerIndex("first")
+        self.updateToolbar()
 
     def createTopMenu(self):
         """create initial menus"""
@@ -397,6 +496,13 @@ class App(QMainWindow):
 
         fileMenu.addSeparator()
 
+        action = QAction("&Verify thumbnails cache", self)
+        action.setStatusTip("Verify thumbnails cache, evict corrupt thumbnails (result in log)")
+        action.triggered.connect(self.onVerifyCache)
+        fileMenu.addAction(action)
+
+        fileMenu.addSeparator()
+
         action = QAction("&Quit", self)
         action.triggered.connect(self.quitApp)
         action.setShortcut("Ctrl+Q")
@@ -755,6 +861,8 @@ class App(QMainWindow):
         if hasattr(self, "explorerSplitter"):
             self.explorerSplitter.replaceWidget(1, self.mainExplorer)
             self.mainExplorer.setRootIndex(self.mainExplorer.model().setRootPath(self.currentDir))
+            # fields needed by new view and not loaded
+            self.mainModel.backfillAdditional(self.mainModel.pathToNode(self.currentDir))
 
         # restore current index and selection
         if needResel:
@@ -774,13 +882,20 @@ class App(QMainWindow):
         # update toolbar
         self.updateToolbar()
 
+    def updateDownloadLimit(self):
+        """display adaptive download limit in status bar"""
+        self.downloadLimitLabel.setText(
+            f"Downloads {download_limiter.inflight}/{download_limiter.limit}"
+            f" ({download_limiter.latency:.2f}s, {download_limiter.errors} errors)"
+        )
+
     def closeEvent(self, event):
         """close app"""
         # save geometry on close
         self.settings.setValue("mainwinpos", self.saveGeometry())
         self.settings.setValue("mainwinstate", self.saveState())
         # save various parameter
-        self.settings.setValue("initialpath", self.currentDir)
+        self.settings.setValue("initialpath", self.loginPath if self.isLoginPending() else self.currentDir)
         self.settings.setValue("viewtype", self.currentExplorerView)
         self.settings.setValue("explorersplittersizes", self.explorerSplitter.saveState())
         self.settings.setValue(
@@ -792,10 +907,9 @@ class App(QMainWindow):
 
         self.slideshow.close()
 
-        # stop control thread pool
-        control_thread_pool.exit_loop()
-
         # stop threading
+        self.downloadLimitTimer.stop()
+        download_generations.new_generation()
         download_thread_pool.shutdown(wait=True, cancel_futures=True)
 
         # remove weakref of Handler logTextBox, just for avoid message as :
@@ -967,7 +1081,8 @@ class App(QMainWindow):
         if not index.isValid():
             assert False
         curNode = index.model().nodePointer(index)
-        log.info(f"setMainExplorerIndex({location}) new node: {curNode.dataColumn(0)}")
+        if curNode is not None:
+            log.info(f"setMainExplorerIndex({location}) new node: {curNode.dataColumn(0)}")
         self.mainExplorer.setCurrentIndex(index)
 
     def onSortColumn(self, logicalIndex: int):
@@ -1011,11 +1126,13 @@ class App(QMainWindow):
 
     def onPrevSlide(self):
         """click button prev in slideshow"""
+        self.slideDirection = -1
         self.setMainExplorerIndex("prev")
 
     def onNextSlide(self):
         """click button next in slideshow"""
         log.info("onNextSlide")
+        self.slideDirection = 1
         self.setMainExplorerIndex("next")
 
     def onSetSlideshowSpeed(self, speed):
@@ -1042,11 +1159,15 @@ class App(QMainWindow):
         menu.exec(QCursor.pos())
 
     def loginDialog(self):
-        """login dialog : create new model, reset views"""
+        """login dialog : login, then new models and reset views (see onLoginFinished)"""
+        if self.isLoginPending():
+            self.statusBar().showMessage("Synology Photos login already in progress")
+            return
         dialog = LoginDialog(self)
         if not dialog.exec():
             return
-        connected = self.synoPhotosLogin(
+        self.loginPath = "/"
+        self.synoPhotosLogin(
             dialog.address.text(),
             dialog.port.text(),
             dialog.username.text(),
@@ -1056,32 +1177,11 @@ class App(QMainWindow):
             dialog.debug.isChecked(),
             dialog.otpcode.text(),
         )
-        if not connected:
-            ret = FailedConnectDialog(synofoto.exception, self).exec()
-            if not ret:
-                QApplication.quit()
-        # set new models using new synophoto
-        self.mainModel = SynoModel(dirs_only=False)
-        self.mainExplorer.setModel(self.mainModel)
-
-        self.sideModel = SynoModel(dirs_only=True)
-        self.sideExplorer.setModel(self.sideModel)
 
-        # reset widgets
-        self.json_view.setModel(JsonModel(data={}))
-        self.thumbnailWidget.setImage(QPixmap())
-
-        # set to root path
-        self.currentDir = "/"
-        self.mainModel.setRootPath(self.currentDir)
-        self.sideExplorer.model().setRootPath(self.currentDir)
-        self.sideExplorer.expandAbsolutePath(self.currentDir)
-        self.navigate(self.mainModel.setRootPath(self.currentDir))
-
-        # TODO : may be something wrong : signals lost after setmodel !?
-        #  as workaround (but enough ?) :
-        self.sideExplorer.selectionModel().currentRowChanged.connect(self.onCurrentRowChangedInSideExpl)
-        self.changeView(self.currentExplorerView)
+    def onVerifyCache(self):
+        """verify thumbnails cache in thread"""
+        self.statusBar().showMessage("Verify thumbnails cache started (result in log)")
+        download_thread_pool.submit(verify_cache, thumbcache)
 
     def about(self):
         """dialog about app"""
@@ -1090,6 +1190,40 @@ class App(QMainWindow):
     def showJsonView(self, event):
         """show dock JSON view"""
         self.json_dock.setHidden(not event)
+        index = self.mainExplorer.selectionModel().currentIndex()
+        if event and index.isValid():
+            self.setJsonDetails(index.model().nodePointer(index))
+
+    def setJsonDetails(self, node: SynoNode):
+        """set node json in dock, with all additional fields (missing fields loaded in thread)"""
+        self.jsonNode = node
+        if not self.json_dock.isHidden() and node.missingAdditional(self.mainModel.additional):
+            self.mainModel.loadAdditionalInThread([node])
+        self.setJsonData(node.rawData())
+
+    def onAdditionalLoaded(self, nodes: list):
+        """additional fields loaded in thread : update json dock if its node"""
+        if self.jsonNode is not None and any(node is self.jsonNode for node in nodes):
+            self.setJsonData(self.jsonNode.rawData())
+
+    def onJsonDockVisibilityChanged(self, visible):
+        """json dock shown : set data kept while hidden"""
+        if visible:
+            self.setJsonData(self.jsonData)
+
+    def setJsonData(self, data):
+        """set data in json dock, only when visible"""
+        self.jsonData = data
+        if self.json_dock.isHidden():
+            return
+        from qt_json_view.model import JsonModel
+
+        if self.json_view is None:
+            from qt_json_view.view import JsonView
+
+            self.json_view = JsonView()
+            self.json_dock.setWidget(self.json_view)
+        self.json_view.setModel(JsonModel(data=formatJson(data)))
 
     def showThumbView(self, event):
         """show dock thumbnail view"""
@@ -1147,11 +1281,14 @@ class App(QMainWindow):
         self.setWindowTitle(f"Synology Photos Explorer - {self.currentDir}")
         self.addressBar.setText(self.currentDir)
         # set json, invalidate thumbnail widget
-        self.json_view.setModel(JsonModel(data=formatJson(node.rawData())))
+        self.setJsonData(node.rawData())
         self.thumbnailWidget.setImage(QPixmap())
         self.slideshow.setPhoto(QPixmap())
+        self.slideshow.prefetch([])
         # download child thumbnails
         self.download_childs_thumbnail(node)
+        # photos created in another view may miss fields
+        self.mainModel.backfillAdditional(node)
         self.history.append(self.currentDir)
 
     def navigateUp(self):
@@ -1215,7 +1352,7 @@ class App(QMainWindow):
     def onDoubleClick(self, index):
         """signal doubleClick in mainExplorer for open folder"""
         node = index.model().nodePointer(index)
-        if node.isDir():
+        if node is not None and node.isDir():
             self.navigate(index)
             self.download_childs_thumbnail(node)
 
@@ -1242,46 +1379,52 @@ class App(QMainWindow):
         if not index.isValid():
             return
         node: SynoNode = index.model().nodePointer(index)
-        data = node.rawData()
+        if node is None:
+            # row of photos page still loading
+            return
         # set json data
-        self.json_view.setModel(JsonModel(data=formatJson(data)))
+        self.setJsonDetails(node)
         # set thumbnail
         if node.node_type == NodeType.FOLDER:
             pass
         elif node.node_type == NodeType.FILE and node._raw_data["type"] == "photo":
-            shared = node.isShared()
-            # use cached function :
-            raw_image = download_thumbnail(
-                node.inode,
-                node.rawData()["additional"]["thumbnail"]["cache_key"],
-                shared,
-                node.passphrase(),
-            )
-            if not raw_image:
-                return
-            if CACHE_PIXMAP:
-                image = QPixmap()
-                image.loadFromData(raw_image)
-                self.thumbnailWidget.setImage(image)
-            else:
-                pixmap = QPixmap()
-                image = QImage()
-                image.loadFromData(raw_image)
-                colorspace = image.colorSpace()
-                if not colorspace.description().startswith("sRGB"):
-                    log.debug(f"convert colorspace {colorspace.description()}")
-                    srgbColorSpace = QColorSpace(QColorSpace.NamedColorSpace.SRgb)
-                    image.convertToColorSpace(srgbColorSpace)
-                pixmap.convertFromImage(image)
-                self.thumbnailWidget.setImage(pixmap)
+            # thumbnail decoded in thread (see onImageDecoded)
+            syno_key = node.rawData()["additional"]["thumbnail"]["cache_key"]
+            self.thumbnailKey = ("dock", node.inode, syno_key)
+            decode_pool.submit_thumbnail(self.thumbnailKey, node.inode, syno_key, node.isShared(), node.passphrase())
             # show image in slideshow
             self.slideshow.setPhoto(node)
+            self.prefetchSlides(index)
             log.debug(f"cache stats: {thumbcache.stats()}")
         else:
+            self.thumbnailKey = None
             pixmap = QPixmap()
             self.thumbnailWidget.setImage(pixmap)
             self.slideshow.setPhoto(pixmap)
 
+    def onImageDecoded(self, key, image: QImage):
+        """image decoded in thread : set thumbnail dock if still current"""
+        if key == self.thumbnailKey and not image.isNull():
+            self.thumbnailWidget.setImage(QPixmap.fromImage(image))
+            log.debug(f"cache stats: {thumbcache.stats()}")
+
+    def prefetchSlides(self, index: QModelIndex):
+        """load in background next photos (in slideshow direction) and previous one"""
+        if self.slideshow.isHidden():
+            self.slideshow.prefetch([])
+            return
+        rows = [index.row() + self.slideDirection * step for step in range(1, self.slideshowPrefetch + 1)]
+        rows.append(index.row() - self.slideDirection)
+        nodes = []
+        for row in rows:
+            sibling = index.siblingAtRow(row)
+            if not sibling.isValid():
+                continue
+            node = index.model().nodePointer(sibling)
+            if node is not None and node.node_type == NodeType.FILE and node.rawData().get("type") == "photo":
+                nodes.append(node)
+        self.slideshow.prefetch(nodes)
+
     def Search(self, section, searchText, shared):
         """Search photos"""
         QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
@@ -1435,6 +1578,8 @@ class App(QMainWindow):
             if index.column() > 0:
                 continue
             node: SynoNode = index.model().nodePointer(index)
+            if node is None:
+                continue
             if node.node_type == NodeType.FILE:
                 log.info(f"Download photo inode {node.inode} {node.dataColumn(0)}")
                 photo_download(node, path)
@@ -1442,6 +1587,8 @@ class App(QMainWindow):
                 log.info(f"Download photos folder inode {node.inode} {node.dataColumn(0)}")
                 dest = os.path.join(path, node.dataColumn(0))
                 os.makedirs(dest, exist_ok=True)
+                # photos pages may still be loading
+                node._model.loadAllChildren(node)
                 for ichild in range(0, node.childCount()):
                     child = node.child(ichild)
                     log.info(f"Download photo {child.dataColumn(0)} ({child.inode})")
@@ -1454,21 +1601,18 @@ class App(QMainWindow):
         if node.isUnknownRowCount():
             return
         if USE_THREAD_CHILDS:
-            control_thread_pool.cancel_futures()
-            if self.futureDownloadChilds:
-                self.eventCancelThumb.set()
-                self.futureDownloadChilds.result()
-            self.eventCancelThumb.clear()
+            # new navigation : pending downloads of previous folder are dropped
+            generation = download_generations.new_generation()
             node.child(0)  # ensure that all child nodes created
-            self.futureDownloadChilds = download_thread_pool.submit(self._thread_download_childs_thumbnail, node)
+            download_generations.submit(generation, self._thread_download_childs_thumbnail, node, generation)
         else:
             for iChild in range(0, node.childCount()):
                 child = node.child(iChild)
-                if child.isFile():
+                if child is not None and child.isFile():
                     self.get_thumbnail_cached(child)
         log.info("download_childs_thumbnail end")
 
-    def _thread_download_childs_thumbnail(self, node: SynoNode):
+    def _thread_download_childs_thumbnail(self, node: SynoNode, generation: int):
         """to be execute in thread (see download_childs_thumbnail)"""
 
         def get_thumbnail_cached(node: SynoNode):
@@ -1493,19 +1637,17 @@ class App(QMainWindow):
             if key in thumbcache:
                 # nothing to do
                 return
-            future = download_thread_pool.submit(download_thumbnail, inode, syno_key, shared, node.passphrase())
-            # add to future pool
-            control_thread_pool.add_future(future)
+            download_generations.submit(generation, download_thumbnail, inode, syno_key, shared, node.passphrase())
 
         # thread begin
         log.info(f"thread childs download start for inode {node.inode}")
         for iChild in range(0, node.childCount()):
-            if self.eventCancelThumb.wait(0.001):
+            if not download_generations.is_current(generation):
                 log.info("thread childs download CANCELLED")
                 return
             child = node.child(iChild)
             if child is None:
-                log.error("child is None")
+                # photos page still loading
                 continue
             if child.isFile():
                 get_thumbnail_cached(child)
@@ -1534,11 +1676,9 @@ class App(QMainWindow):
         if key in thumbcache:
             # nothing to do
             return
-        future = download_thread_pool.submit(download_thumbnail, inode, syno_key, shared, node.passphrase())
-        # add to future pool
-        control_thread_pool.add_future(future)
-
-        return future
+        return download_generations.submit(
+            download_generations.current(), download_thumbnail, inode, syno_key, shared, node.passphrase()
+        )
 
 
 class IntSortTableItem(QTableWidgetItem):
@@ -1586,10 +1726,10 @@ if __name__ == "__main__":
     if "-V" in sys.argv or "--version" in sys.argv:
         print(f"{APP_NAME} - Version {VERSION}")
         # exit threads (launched globally)
-        control_thread_pool.exit_loop()
         download_thread_pool.shutdown(wait=True, cancel_futures=True)
         sys.exit()
 
     app = QApplication(sys.argv)
+    startup.mark("QApplication")
     myApp = App()
     sys.exit(app.exec())
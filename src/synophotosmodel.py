@@ -13,6 +13,9 @@ Code based on :
 from __future__ import annotations
 from typing import Any
 import os
+import functools
+import threading
+from concurrent.futures import Future
 from enum import Enum
 from pathlib import PurePosixPath
 import logging
@@ -28,7 +31,6 @@ from PyQt6.QtCore import (
     QModelIndex,
     QSortFilterProxyModel,
     QSize,
-    QRect,
     pyqtSignal,
     QObject,
     QVariant,
@@ -38,27 +40,22 @@ from PyQt6.QtGui import (
     QStandardItem,
     QFont,
     QPixmap,
+    QPixmapCache,
     QImage,
-    QColorSpace,
-    QColorConstants,
 )
 
-from dotenv import load_dotenv
-
 # Maybe in the future Photos will be merged in official synology_api package :
 #   from synology_api.photos import Photos, DatePhoto
 #   from synology_api.exceptions import PhotosError
 from synology_photos_api.photos import DatePhoto
 
-from internalconfig import CACHE_PIXMAP, PHOTOS_CHUNK
+from internalconfig import PHOTOS_CHUNK
 from photos_api import synofoto
 from utils import smart_unit
 
-from cacheddownload import download_thumbnail
-
+from cache import download_generations
+from imagedecode import decode_pool
 
-# take environment variables (addr, port ,user, password, ...) from .env file
-load_dotenv()
 
 # set logger in stdout
 log = logging.getLogger(__name__)
@@ -67,6 +64,9 @@ log.setLevel(logging.INFO)
 
 ROOT_NAME = "/"
 
+# size of pixmaps cache (KB) for decoded thumbnails
+THUMB_PIXMAP_CACHE = 100 * 1024
+
 UNKNOWN_COUNT = -1
 
 
@@ -76,6 +76,10 @@ class SynoSygnal(QObject):
     directoryLoaded = pyqtSignal(str)
     countUpdated = pyqtSignal(str)
     elementsAdded = pyqtSignal(str)
+    # list of nodes with additional fields loaded
+    additionalLoaded = pyqtSignal(list)
+    # node with photos pages received in thread (see PendingPages)
+    photosReceived = pyqtSignal(object)
 
 
 signal = SynoSygnal()
@@ -119,6 +123,17 @@ nodetype_names = {
 }
 
 
+class PendingPages:
+    """photos pages received in thread, nodes created by model in GUI thread (see SynoModel.fillReceivedPhotos)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (offset, photos) in order
+        self.pages: list[tuple[int, list[dict]]] = []
+        # set when all pages received (or failure)
+        self.done = threading.Event()
+
+
 class SynoNode(QStandardItem):
     """
     Synology Photo Item
@@ -156,28 +171,7 @@ class SynoNode(QStandardItem):
         elif self.node_type == NodeType.FILE:
             # photo json
             self._raw_data = data
-            self._data = [
-                self._raw_data["filename"],
-                DatePhoto(self._raw_data["time"]).to_string("%Y/%m/%d %H:%M:%S"),
-                smart_unit(self._raw_data["filesize"], "B"),
-            ]
-            if "exif" in self._model.additional:
-                self._data.extend(
-                    [
-                        self._raw_data["additional"]["exif"]["aperture"],
-                        self._raw_data["additional"]["exif"]["camera"],
-                        self._raw_data["additional"]["exif"]["exposure_time"],
-                        self._raw_data["additional"]["exif"]["focal_length"],
-                        self._raw_data["additional"]["exif"]["iso"],
-                        self._raw_data["additional"]["exif"]["lens"],
-                    ]
-                )
-            if "resolution" in self._model.additional:
-                self._data.extend(
-                    [
-                        f'{self._raw_data["additional"]["resolution"]["width"]} x {self._raw_data["additional"]["resolution"]["height"]}',
-                    ]
-                )
+            self._data = self._fileData()
             self.inode = self._raw_data["id"]
             self.nb_folders = 0
 
@@ -190,6 +184,8 @@ class SynoNode(QStandardItem):
             assert False
 
         self._children = []
+        # photos pages still loading in thread : their rows are reserved, without node
+        self._pending: PendingPages | None = None
         self._parent = parent
         if self._parent:
             self.dirs_only = self._parent.dirs_only
@@ -200,6 +196,36 @@ class SynoNode(QStandardItem):
     def __hash__(self):
         return self.inode
 
+    def _fileData(self) -> list:
+        """columns data for NodeType.FILE. Empty when additional field not loaded (see SynoModel.loadAdditional)"""
+        additional = self._raw_data.get("additional", {})
+        data = [
+            self._raw_data["filename"],
+            DatePhoto(self._raw_data["time"]).to_string("%Y/%m/%d %H:%M:%S"),
+            smart_unit(self._raw_data["filesize"], "B"),
+        ]
+        if "exif" in self._model.additional:
+            exif = additional.get("exif", {})
+            data.extend(
+                exif.get(key, "") for key in ["aperture", "camera", "exposure_time", "focal_length", "iso", "lens"]
+            )
+        if "resolution" in self._model.additional:
+            resolution = additional.get("resolution")
+            data.append(f'{resolution["width"]} x {resolution["height"]}' if resolution else "")
+        return data
+
+    def missingAdditional(self, fields: list[str]) -> list[str]:
+        """return additional fields not loaded for photo"""
+        if self.node_type != NodeType.FILE:
+            return []
+        additional = self._raw_data.get("additional", {})
+        return [field for field in fields if field not in additional]
+
+    def mergeAdditional(self, additional: dict[str, object]) -> None:
+        """add additional fields loaded after node creation"""
+        self._raw_data.setdefault("additional", {}).update(additional)
+        self._data = self._fileData()
+
     def __eq__(self, other):
         """equality test"""
         return self.inode == other.inode and self._data == other._data and self.space == other.space
@@ -283,32 +309,87 @@ class SynoNode(QStandardItem):
         signal.countUpdated.emit(str(self.inode))
         return True
 
+    def createNodes(self, first_row: int, elements: list[dict]) -> None:
+        """create children nodes for elements in reserved rows, starting at row"""
+        for row, element in enumerate(elements, first_row):
+            if row < self.nb_folders:
+                album = element
+                node = SynoNode(self.space, album, NodeType.FOLDER, self, self._model)
+            elif row < self.nb_folders + self.nb_photos:
+                photo = element
+                node = SynoNode(self.space, photo, NodeType.FILE, self, self._model)
+            else:
+                assert False
+            if row >= len(self._children):
+                assert False
+            self._children[row] = node
+
+    def _fetchPhotos(self, list_method, *args, **kwargs) -> None:
+        """
+        create photos nodes from list method, pages requested concurrently
+
+        When several pages, the first page is waited, next pages are received in thread and their
+        reserved rows filled by the model (see SynoModel.fillReceivedPhotos) : meanwhile these rows have no node
+        """
+        fetch = functools.partial(
+            synofoto.api.fetch_pages,
+            list_method,
+            *args,
+            total=self.nb_photos,
+            page_size=PHOTOS_CHUNK,
+            additional=self._model.view_additional,
+            sort_by="takentime",
+            **kwargs,
+        )
+        if self.nb_photos <= PHOTOS_CHUNK:
+            fetch(on_prefix=lambda offset, photos: self.createNodes(self.nb_folders + offset, photos))
+            return
+        pending = self._pending = PendingPages()
+        first_page = Future()
+
+        def onPage(offset: int, photos: list[dict]) -> None:
+            if offset == 0:
+                first_page.set_result(photos)
+                return
+            with pending.lock:
+                pending.pages.append((offset, photos))
+            signal.photosReceived.emit(self)
+
+        def load() -> None:
+            try:
+                fetch(on_prefix=onPage)
+            except Exception as _e:
+                log.error(f"photos pages of {self.inode} failed : {_e}")
+                if not first_page.done():
+                    first_page.set_exception(_e)
+            pending.done.set()
+            signal.photosReceived.emit(self)
+
+        threading.Thread(target=load, name="photos_pages", daemon=True).start()
+        try:
+            self.createNodes(self.nb_folders, first_page.result())
+        except Exception:
+            # next access retries
+            self._pending = None
+            raise
+
     def _createChildNodes(self) -> None:
         """create children nodes for NodeType.FILE"""
         self.updateRowCount()
+
         if self.space in [SpaceType.PERSONAL, SpaceType.SHARED]:
             log.info(f"list_folders({self.inode}, {self.space == SpaceType.SHARED})")
-            elements = synofoto.api.list_folders(
-                self.inode,
-                self.space == SpaceType.SHARED,
-                sort_by="filename",
+            self.createNodes(
+                0,
+                synofoto.api.iter_list_folders(
+                    self.inode,
+                    self.space == SpaceType.SHARED,
+                    sort_by="filename",
+                ),
             )
             log.info(f"photos_in_folder({self.inode}, {self.space == SpaceType.SHARED})")
             if not self.dirs_only:
-                left = self.nb_photos
-                while left:
-                    partial_elements = synofoto.api.photos_in_folder(
-                        self.inode,
-                        self.space == SpaceType.SHARED,
-                        offset=self.nb_photos - left,
-                        limit=min(PHOTOS_CHUNK, left),
-                        additional=self._model.additional,
-                        sort_by="takentime",
-                    )
-                    left -= len(partial_elements)
-                    if left:
-                        log.warning(f"{left} photos left")
-                    elements.extend(partial_elements)
+                self._fetchPhotos(synofoto.api.photos_in_folder, self.inode, self.space == SpaceType.SHARED)
 
         elif self.space == SpaceType.SEARCH:
             section, search, team = self.searchContext
@@ -316,81 +397,31 @@ class SynoNode(QStandardItem):
                 return
             if section == "tag":
                 log.warning(f"photos_with_tag({search}, {team})")
-                left = self.nb_photos
-                elements = []
-                while left:
-                    partial_elements = synofoto.api.photos_with_tag(
-                        search,
-                        team=team,
-                        offset=self.nb_photos - left,
-                        limit=min(PHOTOS_CHUNK, left),
-                        additional=self._model.additional,
-                        sort_by="takentime",
-                    )
-                    left -= len(partial_elements)
-                    if left:
-                        log.warning(f"{left} photos left")
-                    elements.extend(partial_elements)
+                self._fetchPhotos(synofoto.api.photos_with_tag, search, team=team)
             elif section == "keyword":
                 log.warning(f"photos_with_keyword({search}, {team})")
-                left = self.nb_photos
-                elements = []
-                while left:
-                    partial_elements = synofoto.api.photos_with_keyword(
-                        search,
-                        team=team,
-                        offset=self.nb_photos - left,
-                        limit=min(PHOTOS_CHUNK, left),
-                        additional=self._model.additional,
-                        sort_by="takentime",
-                    )
-                    left -= len(partial_elements)
-                    if left:
-                        log.warning(f"{left} photos left")
-                    elements.extend(partial_elements)
+                self._fetchPhotos(synofoto.api.photos_with_keyword, search, team=team)
 
         elif self.space == SpaceType.ALBUM:
             if self.node_type == NodeType.SPACE:
                 log.info("list_albums()")
-                elements = synofoto.api.list_albums(sort_by="album_name", category="normal_share_with_me")
+                self.createNodes(
+                    0, synofoto.api.iter_list_albums(sort_by="album_name", category="normal_share_with_me")
+                )
             else:
                 if not self.dirs_only:
                     log.info(f"photos_in_album({self.inode})")
-                    elements = []
-                    left = self.nb_photos
-                    while left:
-                        partial_elements = synofoto.api.photos_in_album(
-                            (
-                                self.inode
-                                if "passphrase" not in self._raw_data or not self._raw_data["passphrase"]
-                                else self._raw_data["passphrase"]
-                            ),
-                            offset=self.nb_photos - left,
-                            limit=min(PHOTOS_CHUNK, left),
-                            additional=self._model.additional,
-                            sort_by="takentime",
-                            # passphrase=self._raw_data["passphrase"],
-                        )
-                        left -= len(partial_elements)
-                        if left:
-                            log.warning(f"{left} photos left")
-                        elements.extend(partial_elements)
+                    self._fetchPhotos(
+                        synofoto.api.photos_in_album,
+                        (
+                            self.inode
+                            if "passphrase" not in self._raw_data or not self._raw_data["passphrase"]
+                            else self._raw_data["passphrase"]
+                        ),
+                    )
         else:
             assert False
 
-        for row, element in enumerate(elements):
-            if row < self.nb_folders:
-                album = element
-                node = SynoNode(self.space, album, NodeType.FOLDER, self, self._model)
-            elif row < self.nb_folders + self.nb_photos:
-                photo = element
-                node = SynoNode(self.space, photo, NodeType.FILE, self, self._model)
-            else:
-                assert False
-            if row >= len(self._children):
-                assert False
-            self._children[row] = node
-
     def findChild(self, name: str) -> SynoNode:
         """return child node 'name' in column 0"""
         for node in self._children:
@@ -435,11 +466,16 @@ class SynoNode(QStandardItem):
         # log.info(f"child({row} -> {self._data}) nb_folders:{self.nb_folders}")
         self.updateRowCount()
         if row >= 0 and row < self.childCount():
-            if self.node_type != NodeType.ROOT and (not self._children or self._children[row] is None):
+            if (
+                self.node_type != NodeType.ROOT
+                and self._pending is None
+                and (not self._children or self._children[row] is None)
+            ):
                 QApplication.setOverrideCursor(QtCore.Qt.CursorShape.WaitCursor)
                 self._createChildNodes()
                 QApplication.restoreOverrideCursor()
-            return self._children[row]
+            # None for rows of photos pages still loading (or removed as missing)
+            return self._children[row] if row < len(self._children) else None
 
     def parent(self) -> SynoNode:
         """return node parent"""
@@ -524,7 +560,18 @@ class SynoModel(QAbstractItemModel):
             additional.append("thumbnail")
         if additional is None:
             additional = []
+        # all additional fields displayed by model
         self.additional = list(set(additional))
+        # additional fields requested in photos lists, for active view (see useThumbnail)
+        self.view_additional = self.additional
+        signal.additionalLoaded.connect(self.refreshNodes)
+        # thumbnails decoded in thread : pending nodes by decode key
+        self._decodeNodes: dict[tuple, SynoNode] = {}
+        decode_pool.signal.decoded.connect(self._onThumbnailDecoded)
+        # queued : drop may be emitted from data() (submit in GUI thread)
+        decode_pool.signal.dropped.connect(self._onThumbnailDropped, Qt.ConnectionType.QueuedConnection)
+        signal.photosReceived.connect(self._onPhotosReceived)
+        QPixmapCache.setCacheLimit(max(QPixmapCache.cacheLimit(), THUMB_PIXMAP_CACHE))
         self._root = SynoNode(
             space=SpaceType.ROOT,
             node_type=NodeType.ROOT,
@@ -646,53 +693,35 @@ class SynoModel(QAbstractItemModel):
                         NodeType.FOLDER,
                         NodeType.SEARCH,
                     ]:
-                        image = QPixmap(os.path.abspath("./src/ico/icons8-folder-200.png"))
-                        return image.scaled(
-                            self.thumbnail_size.width(),
-                            self.thumbnail_size.height(),
-                            Qt.AspectRatioMode.KeepAspectRatio,
-                        )
-                    shared = node.isShared()
-                    passphrase = node.passphrase()
+                        key = f"folder/{self.thumbnail_size.width()}x{self.thumbnail_size.height()}"
+                        image = QPixmapCache.find(key)
+                        if image is None:
+                            image = QPixmap(os.path.abspath("./src/ico/icons8-folder-200.png")).scaled(
+                                self.thumbnail_size.width(),
+                                self.thumbnail_size.height(),
+                                Qt.AspectRatioMode.KeepAspectRatio,
+                            )
+                            QPixmapCache.insert(key, image)
+                        return image
                     syno_key = node._raw_data["additional"]["thumbnail"]["cache_key"]
-                    if CACHE_PIXMAP:
-                        image = QPixmap()
-                        image.loadFromData(download_thumbnail(node.inode, syno_key, shared, passphrase))
-                        return image.scaled(
-                            self.thumbnail_size.width(),
-                            self.thumbnail_size.height(),
-                            Qt.AspectRatioMode.KeepAspectRatio,
-                        )
-                    else:
-                        log.debug(f"model need thumb {node.inode}")
-                        raw_image = download_thumbnail(node.inode, syno_key, shared, passphrase)
-                        if not raw_image:
-                            return QVariant()
-                        pixmap = QPixmap()
-                        image = QImage()
-                        image.loadFromData(raw_image)
-                        colorspace = image.colorSpace()
-                        if not colorspace.description().startswith("sRGB"):
-                            srgbColorSpace = QColorSpace(QColorSpace.NamedColorSpace.SRgb)
-                            image.convertToColorSpace(srgbColorSpace)
-                        pixmap.convertFromImage(image)
-                        # Because we want uses setUniformItemSizes(True) in views (for performance) :
-                        # insert thumbnail in black square
-                        pixmap = pixmap.scaled(
-                            self.thumbnail_size.width(),
-                            self.thumbnail_size.height(),
-                            Qt.AspectRatioMode.KeepAspectRatio,
-                        )
-                        pixmap_paint = QPixmap(self.thumbnail_size.width(), self.thumbnail_size.height())
-                        pixmap_paint.fill(QColorConstants.Black)
-                        painter = QtGui.QPainter(pixmap_paint)
-                        rect = QRect(0, 0, pixmap.width(), pixmap.height())
-                        rect.translate(
-                            (self.thumbnail_size.width() - pixmap.width()) // 2,
-                            (self.thumbnail_size.height() - pixmap.height()) // 2,
-                        )
-                        painter.drawPixmap(rect, pixmap)
-                        return pixmap_paint
+                    # Because we want uses setUniformItemSizes(True) in views (for performance) :
+                    # thumbnail in black square
+                    key = ("thumb", node.inode, syno_key, self.thumbnail_size.width(), self.thumbnail_size.height())
+                    pixmap = QPixmapCache.find(str(key))
+                    if pixmap is not None:
+                        return pixmap
+                    # decoded in thread, dataChanged emitted when ready
+                    log.debug(f"model need thumb {node.inode}")
+                    self._decodeNodes[key] = node
+                    decode_pool.submit_thumbnail(
+                        key,
+                        node.inode,
+                        syno_key,
+                        node.isShared(),
+                        node.passphrase(),
+                        QSize(self.thumbnail_size),
+                    )
+                    return QVariant()
 
                 if node.node_type in self.icons:
                     return self.icons[node.node_type]
@@ -746,7 +775,7 @@ class SynoModel(QAbstractItemModel):
         node.updateIfUnknownRowCount()
         for row in range(0, node.childCount()):
             child = node.child(row)
-            if child._data[0] == part:
+            if child is not None and child._data[0] == part:
                 return child
         return None
 
@@ -790,8 +819,154 @@ class SynoModel(QAbstractItemModel):
         index.internalPointer().updateIfUnknownRowCount()
 
     def useThumbnail(self, thumbnail: bool = False) -> None:
-        """use thumbnail as icon"""
+        """use thumbnail as icon
+
+        Icons view needs only thumbnail key, others fields (exif, ...) are loaded when needed
+        """
         self.thumbnail = thumbnail
+        self.view_additional = ["thumbnail"] if thumbnail and "thumbnail" in self.additional else self.additional
+
+    def loadAdditional(self, nodes: list[SynoNode], fields: list[str] = None) -> list[SynoNode]:
+        """
+        load missing additional fields (default: model fields) of photos nodes with batched photos_from_ids
+        (concurrent loads are merged by the API hydrator). Return updated nodes
+
+        (no Qt call : can be executed in thread)
+        """
+        fields = self.additional if fields is None else fields
+        # group by space
+        groups: dict[tuple, dict[int, SynoNode]] = {}
+        for node in nodes:
+            if node is not None and node.missingAdditional(fields):
+                groups.setdefault((node.isShared(), node.passphrase()), {})[node.inode] = node
+        updated = []
+        for (shared, passphrase), group in groups.items():
+            # album photos may be in personal or shared space
+            for team in [shared] if shared is not None or passphrase else [False, True]:
+                photos = synofoto.api.hydrator.get_many(list(group), bool(team), passphrase, fields)
+                for photo_id, photo in photos.items():
+                    node = group.pop(photo_id)
+                    node.mergeAdditional(photo.get("additional", {}))
+                    updated.append(node)
+                if not group:
+                    break
+        return updated
+
+    def backfillAdditional(self, node: SynoNode) -> None:
+        """load in thread missing fields of active view for photos children of node"""
+        if node is None or node.isUnknownRowCount():
+            return
+        missing = [
+            child for child in node._children if child is not None and child.missingAdditional(self.view_additional)
+        ]
+        if not missing:
+            return
+        log.info(f"backfill {self.view_additional} for {len(missing)} photos")
+        self.loadAdditionalInThread(missing, self.view_additional)
+
+    def loadAdditionalInThread(self, nodes: list[SynoNode], fields: list[str] = None) -> None:
+        """load missing additional fields in thread (see loadAdditional), signal additionalLoaded emitted"""
+
+        def load():
+            signal.additionalLoaded.emit(self.loadAdditional(nodes, fields))
+
+        download_generations.submit(download_generations.current(), load)
+
+    def refreshNodes(self, nodes: list[SynoNode]) -> None:
+        """(slot) refresh rows of nodes (additional fields loaded)"""
+        # rows range by parent (one pass on children : node.row() is a list search)
+        groups: dict[int, tuple[SynoNode, set[int]]] = {}
+        for node in nodes:
+            parent = node.parent()
+            if node._model is self and parent is not None:
+                groups.setdefault(id(parent), (parent, set()))[1].add(id(node))
+        last_column = self.columnCount(QModelIndex()) - 1
+        for parent, ids in groups.values():
+            rows = [row for row, child in enumerate(parent._children) if id(child) in ids]
+            if not rows:
+                continue
+            self.dataChanged.emit(
+                self.createIndex(min(rows), 0, parent.child(min(rows))),
+                self.createIndex(max(rows), last_column, parent.child(max(rows))),
+            )
+
+    def _onThumbnailDecoded(self, key: object, image: QImage) -> None:
+        """(slot) thumbnail decoded in thread : keep pixmap, refresh node icon"""
+        node = self._decodeNodes.pop(key, None)
+        if node is None or image.isNull() or node.parent() is None:
+            return
+        QPixmapCache.insert(str(key), QPixmap.fromImage(image))
+        index = self.createIndex(node.row(), 0, node)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+    def _onThumbnailDropped(self, key: object) -> None:
+        """(slot) decode request dropped (queue full, stale download) : refresh node icon, requested again if visible"""
+        node = self._decodeNodes.pop(key, None)
+        if node is None or node.parent() is None:
+            return
+        index = self.createIndex(node.row(), 0, node)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+    def _onPhotosReceived(self, node: SynoNode) -> None:
+        """(slot) photos pages received in thread"""
+        if node._model is self:
+            self.fillReceivedPhotos(node)
+
+    def fillReceivedPhotos(self, node: SynoNode) -> None:
+        """create nodes of photos pages received in thread in their reserved rows (GUI thread), views notified"""
+        pending = node._pending
+        if pending is None or node.parent() is None:
+            return
+        with pending.lock:
+            pages, pending.pages = pending.pages, []
+        last_column = self.columnCount(QModelIndex()) - 1
+        for offset, photos in pages:
+            if not photos:
+                continue
+            first = node.nb_folders + offset
+            last = min(first + len(photos), len(node._children)) - 1
+            node.createNodes(first, photos[: last - first + 1])
+            self.dataChanged.emit(
+                self.createIndex(first, 0, node._children[first]),
+                self.createIndex(last, last_column, node._children[last]),
+            )
+        with pending.lock:
+            if not pending.done.is_set() or pending.pages:
+                return
+        node._pending = None
+        # rows without photo (failed or short page) : removed, contiguous ranges from the end
+        missing = [row for row in range(node.nb_folders, len(node._children)) if node._children[row] is None]
+        if not missing:
+            return
+        log.warning(f"{node.nb_photos - len(missing)}/{node.nb_photos} photos received for {node.inode}")
+        parent = self.createIndex(node.row(), 0, node)
+        while missing:
+            last = first = missing.pop()
+            while missing and missing[-1] == first - 1:
+                first = missing.pop()
+            self.beginRemoveRows(parent, first, last)
+            del node._children[first : last + 1]
+            node.nb_photos -= last - first + 1
+            self.endRemoveRows()
+        signal.countUpdated.emit(str(node.inode))
+
+    def loadAllChildren(self, node: SynoNode) -> None:
+        """create all children nodes, waiting for photos pages still loading in thread"""
+        node.updateRowCount()
+        if node.childCount() > 0:
+            node.child(0)
+        pending = node._pending
+        if pending is not None:
+            pending.done.wait()
+            self.fillReceivedPhotos(node)
+
+    def release(self) -> None:
+        """disconnect from module signals before the model is dropped (models replaced after login)"""
+        signal.additionalLoaded.disconnect(self.refreshNodes)
+        signal.photosReceived.disconnect(self._onPhotosReceived)
+        decode_pool.signal.decoded.disconnect(self._onThumbnailDecoded)
+        decode_pool.signal.dropped.disconnect(self._onThumbnailDropped)
+        self._decodeNodes.clear()
 
     def setThumbnailSize(self, size: QSize) -> None:
         """update node child count if unknown"""
@@ -11,8 +11,6 @@ from PyQt6.QtWidgets import QApplication, QTreeView, QMessageBox
 
 from dotenv import load_dotenv
 
-from cache import control_thread_pool
-
 from synophotosmodel import SynoModel
 from photos_api import synofoto
 
@@ -86,6 +84,3 @@ if __name__ == "__main__":
         # launch application
         mytree = SynoTreeView()
         app.exec()
-
-    # exit from download thread (created on init, not used here)
-    control_thread_pool.exit_loop()
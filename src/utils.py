@@ -2,6 +2,8 @@
     some common utilities
 """
 
+import time
+
 
 def seconds_tostring(seconds, **kwargs):
     """
@@ -39,3 +41,29 @@ def smart_unit(value, unit):
         return f"{(value / (1000 * 1000.0)):.2f} M{unit}"
     if value > 1000:
         return f"{(value / (1000.0)):.2f} K{unit}"
+
+
+class StartupProfile:
+    """
+    startup steps timings, printed if enabled (--profile-startup)
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._start = self._last = time.perf_counter()
+        self._steps = []
+
+    def mark(self, step):
+        """end of step (since previous mark)"""
+        now = time.perf_counter()
+        self._steps.append((step, now - self._last))
+        self._last = now
+
+    def report(self, title="startup"):
+        """print steps marked since last report"""
+        if self.enabled:
+            print(f"--- {title} profile")
+            for step, duration in self._steps:
+                print(f"  {step:<30} {duration * 1000:8.1f} ms")
+            print(f"  {'total':<30} {(self._last - self._start) * 1000:8.1f} ms")
+        self._steps = []